@@ -1,21 +1,9 @@
 import streamlit as st
-import re
-import requests
-from bs4 import BeautifulSoup
 import time
-import pandas as pd
 import os
-from openai import OpenAI
-from io import StringIO, BytesIO
 from datetime import datetime
-import csv
-import logging
-import validators
-import email_validator
-
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
+from scout_core import setup_api_keys, export_businesses, EXPORT_FORMATS, PLACES_MAX_RESULTS
+from jobs import get_job_queue, ensure_job_workers, JOB_POLL_INTERVAL
 
 # Configuration and Authentication
 def authenticate(password_input):
@@ -24,421 +12,129 @@ def authenticate(password_input):
         return True
     return False
 
-def setup_api_keys():
-    openai_api_key = os.environ.get("OPENAI_API_KEY", "")
-    google_places_key = os.environ.get("GOOGLE_PLACES_KEY", "")
-    return openai_api_key, google_places_key
+# Streamlit App Components
+def display_login_page():
+    st.title("SignalScout - Login")
+    st.markdown("Please log in to continue.")
+    password = st.text_input("Password", type="password")
+    login_button = st.button("Login")
+    
+    if login_button:
+        if authenticate(password):
+            st.session_state["authenticated"] = True
+            st.experimental_rerun()
+        else:
+            st.error("Invalid password!")
 
-# Email Extraction and Validation Functions
-def is_valid_email(email):
-    """Enhanced email validation using email-validator library"""
-    try:
-        # Basic format validation
-        if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
-            return False
-        
-        # More thorough validation with email_validator
-        email_validator.validate_email(email, check_deliverability=False)
+def display_business(index, business):
+    with st.expander(f"{index+1}. {business['name']}"):
+        st.write(f"**Address:** {business['address']}")
+        st.write(f"**Business Types:** {', '.join(business['types'])}")
         
-        # Additional checks
-        domain = email.split('@')[1]
-        
-        # Check against disposable email domains (simplified check)
-        disposable_domains = ['mailinator.com', 'tempmail.com', 'fakeinbox.com', 'temp-mail.org']
-        if domain.lower() in disposable_domains:
-            logger.info(f"Filtered out disposable email: {email}")
-            return False
+        if business['website']:
+            st.write(f"**Website:** [{business['website']}]({business['website']})")
+        else:
+            st.write("**Website:** Not available")
             
-        # Filter out certain patterns that might be invalid
-        invalid_patterns = [
-            r'example\.com$',  # Example domains
-            r'test.*@',         # Test emails
-            r'noreply@',        # No-reply addresses
-            r'donotreply@',     # Do not reply addresses
-        ]
+        if business['phone']:
+            st.write(f"**Phone:** {business['phone']}")
+        else:
+            st.write("**Phone:** Not available")
         
-        for pattern in invalid_patterns:
-            if re.search(pattern, email, re.IGNORECASE):
-                logger.info(f"Filtered out invalid pattern in email: {email}")
-                return False
-                
-        return True
-    except Exception as e:
-        logger.warning(f"Email validation error for {email}: {str(e)}")
-        return False
+        if business['email']:
+            st.write(f"**Emails:** {', '.join(business['email'])}")
+        else:
+            st.write("**Emails:** Not found")
 
-def extract_emails_from_text(text):
+def display_job(job_id):
     """
-    Enhanced function to extract emails from text using various regex patterns
-    to account for different email formats and obfuscation techniques
+    Show a background search job. While it runs, its progress and the
+    businesses enriched so far are shown and the page polls for more.
+    Returns the job's businesses once it has finished.
     """
-    if not text:
+    job_queue = get_job_queue()
+    job = job_queue.get(job_id)
+    if job is None:
+        st.warning("That search is no longer available.")
         return []
     
-    # Standard email pattern
-    standard_pattern = r'[\w\.-]+@[\w\.-]+\.\w+'
-    
-    # Pattern for emails with common obfuscation (e.g., "email at domain dot com")
-    text_with_replacements = text
-    replacements = [
-        (r'\s+at\s+', '@'),
-        (r'\s+dot\s+', '.'),
-        (r'<span class="katex-display"><span class="katex"><span class="katex-mathml"><math xmlns="http://www.w3.org/1998/Math/MathML" display="block"><semantics><mrow><mi>a</mi><mi>t</mi></mrow><annotation encoding="application/x-tex">at</annotation></semantics></math></span><span class="katex-html" aria-hidden="true"><span class="base"><span class="strut" style="height:0.6151em;"></span><span class="mord mathnormal">a</span><span class="mord mathnormal">t</span></span></span></span></span>', '@'),
-        (r'<span class="katex-display"><span class="katex"><span class="katex-mathml"><math xmlns="http://www.w3.org/1998/Math/MathML" display="block"><semantics><mrow><mi>d</mi><mi>o</mi><mi>t</mi></mrow><annotation encoding="application/x-tex">dot</annotation></semantics></math></span><span class="katex-html" aria-hidden="true"><span class="base"><span class="strut" style="height:0.6944em;"></span><span class="mord mathnormal">d</span><span class="mord mathnormal">o</span><span class="mord mathnormal">t</span></span></span></span></span>', '.'),
-        (r'<span class="katex"><span class="katex-mathml"><math xmlns="http://www.w3.org/1998/Math/MathML"><semantics><mrow><mi>a</mi><mi>t</mi></mrow><annotation encoding="application/x-tex">at</annotation></semantics></math></span><span class="katex-html" aria-hidden="true"><span class="base"><span class="strut" style="height:0.6151em;"></span><span class="mord mathnormal">a</span><span class="mord mathnormal">t</span></span></span></span>', '@'),
-        (r'<span class="katex"><span class="katex-mathml"><math xmlns="http://www.w3.org/1998/Math/MathML"><semantics><mrow><mi>d</mi><mi>o</mi><mi>t</mi></mrow><annotation encoding="application/x-tex">dot</annotation></semantics></math></span><span class="katex-html" aria-hidden="true"><span class="base"><span class="strut" style="height:0.6944em;"></span><span class="mord mathnormal">d</span><span class="mord mathnormal">o</span><span class="mord mathnormal">t</span></span></span></span>', '.'),
-        (r' at ', '@'),
-        (r' dot ', '.'),
-    ]
-    
-    for old, new in replacements:
-        text_with_replacements = re.sub(old, new, text_with_replacements, flags=re.IGNORECASE)
-    
-    # Extract emails using standard pattern
-    emails = re.findall(standard_pattern, text, re.IGNORECASE)
-    emails_from_replaced = re.findall(standard_pattern, text_with_replacements, re.IGNORECASE)
-    
-    # Combine and filter for unique valid emails
-    all_emails = list(set(emails + emails_from_replaced))
-    valid_emails = [email for email in all_emails if is_valid_email(email)]
-    
-    return valid_emails
-
-def extract_emails_from_html(html_content):
-    """Extract emails from HTML content, including mailto links and data attributes"""
-    emails = []
-    
-    if not html_content:
-        return emails
-    
-    # Extract standard emails from text
-    text_emails = extract_emails_from_text(html_content)
-    emails.extend(text_emails)
-    
-    # Parse HTML and look for mailto links
-    try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Extract from mailto links
-        mailto_links = soup.select('a[href^="mailto:"]')
-        for link in mailto_links:
-            href = link.get('href', '')
-            email_match = re.search(r'mailto:([\w\.-]+@[\w\.-]+\.\w+)', href)
-            if email_match:
-                emails.append(email_match.group(1))
-                
-        # Extract from data-email attributes (common in protected emails)
-        elements_with_data_email = soup.select('[data-email]')
-        for element in elements_with_data_email:
-            email = element.get('data-email', '')
-            if '@' in email and '.' in email:
-                emails.append(email)
-                
-        # Look for obfuscated emails in scripts (common technique)
-        scripts = soup.find_all('script')
-        for script in scripts:
-            script_text = script.string if script.string else ""
-            if script_text and ('email' in script_text.lower() or '@' in script_text):
-                # Look for patterns like var email = 'user' + '@' + 'domain.com';
-                email_parts = re.findall(r'[\'"]([\w\.-]+)[\'"][\s]*\+[\s]*[\'"]@[\'"][\s]*\+[\s]*[\'"]([\w\.-]+\.\w+)[\'"]', script_text)
-                for parts in email_parts:
-                    if len(parts) == 2:
-                        emails.append(f"{parts[0]}@{parts[1]}")
-    except Exception as e:
-        logger.error(f"HTML parsing error: {str(e)}")
-    
-    # Filter for unique valid emails
-    unique_valid_emails = []
-    for email in emails:
-        if email not in unique_valid_emails and is_valid_email(email):
-            unique_valid_emails.append(email)
-    
-    return unique_valid_emails
-
-def crawl_contact_pages(base_url):
-    """
-    Enhanced function to crawl potential contact pages of a given website
-    to find email addresses
-    """
-    emails = []
-    if not base_url:
-        return emails
-        
-    # Ensure the base URL has a trailing slash for path joining
-    if not base_url.endswith('/'):
-        base_url += '/'
-        
-    # Remove protocol for checking
-    clean_base = base_url.split('://')[-1]
-    
-    # Common contact page paths
-    contact_paths = [
-        'contact', 'contact-us', 'contacts', 'about', 'about-us', 'get-in-touch',
-        'reach-us', 'connect', 'support', 'help', 'info', 'team', 'our-team', 
-        'people', 'staff', 'directory', 'meet-the-team', 'meet-our-team',
-        'company/team', 'company/contact', 'company/about',
-        'about/contact', 'about/team', 'en/contact', 'en/about',
-    ]
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
-    # First crawl the homepage
-    try:
-        logger.info(f"Checking homepage at {base_url}")
-        response = requests.get(base_url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            page_emails = extract_emails_from_html(response.text)
-            emails.extend([e for e in page_emails if e not in emails])
-            
-            # Also extract contact page links from homepage
-            soup = BeautifulSoup(response.text, 'html.parser')
-            contact_links = []
-            
-            # Look for links containing "contact" or similar terms
-            for link in soup.find_all('a', href=True):
-                href = link.get('href', '').lower()
-                link_text = link.text.lower()
-                
-                if any(term in link_text for term in ['contact', 'email', 'reach', 'connect']):
-                    if href.startswith('/'):
-                        contact_links.append(base_url.rstrip('/') + href)
-                    elif href.startswith('http'):
-                        if clean_base in href:  # Only if it's the same domain
-                            contact_links.append(href)
-                    else:
-                        contact_links.append(base_url.rstrip('/') + '/' + href)
-            
-            # Add these discovered links to our contact paths (but avoid duplicates)
-            for link in contact_links:
-                if link not in [base_url + path for path in contact_paths]:
-                    contact_paths.append(link.replace(base_url, '').lstrip('/'))
-    except Exception as e:
-        logger.error(f"Error crawling homepage: {str(e)}")
-    
-    # Now check all the contact paths
-    for path in contact_paths:
-        if path.startswith('http'):
-            # This is a full URL we discovered earlier
-            contact_url = path
+    if job["status"] in ("queued", "running"):
+        if job["status"] == "queued":
+            st.progress(0.0, text=f"Search for '{job['query']}' is queued...")
         else:
-            # This is a path we need to append to the base_url
-            contact_url = base_url + path
-        
-        try:
-            logger.info(f"Checking contact page at {contact_url}")
-            response = requests.get(contact_url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                page_emails = extract_emails_from_html(response.text)
-                emails.extend([e for e in page_emails if e not in emails])
-        except Exception as e:
-            logger.error(f"Error crawling {contact_url}: {str(e)}")
-        
-        # Be nice to the server
-        time.sleep(1)
-    
-    # Filter for unique valid emails
-    unique_valid_emails = []
-    for email in emails:
-        if email not in unique_valid_emails and is_valid_email(email):
-            unique_valid_emails.append(email)
-    
-    return unique_valid_emails
-
-def extract_businesses_from_query(query, google_places_key, num_results=5):
-    if not query or not google_places_key:
-        return []
-
-    url = f"https://maps.googleapis.com/maps/api/place/textsearch/json?query={query}&key={google_places_key}"
-    response = requests.get(url)
-    data = response.json()
-    
-    if data.get("status") != "OK":
-        logger.error(f"Google Places API error: {data.get('status')}")
+            st.progress(
+                job["completed"] / max(job["discovered"], 1),
+                text=f"Searching '{job['query']}': enriched {job['completed']} of {job['discovered']} businesses"
+            )
+        if st.button("Cancel search"):
+            job_queue.cancel(job_id)
+            st.rerun()
+        
+        partial_results = job_queue.results(job_id)
+        if partial_results:
+            st.subheader("Results so far")
+            for i, business in enumerate(partial_results):
+                display_business(i, business)
+        
+        # Poll for progress; the search itself runs in a job worker
+        time.sleep(JOB_POLL_INTERVAL)
+        st.rerun()
+    
+    if job["status"] == "failed":
+        st.error(f"Search failed: {job['error']}")
         return []
-        
-    results = data.get("results", [])[:num_results]
-    businesses = []
+    if job["status"] == "cancelled":
+        st.info("Search cancelled.")
     
-    for result in results:
-        business = {
-            "name": result.get("name", ""),
-            "address": result.get("formatted_address", ""),
-            "place_id": result.get("place_id", ""),
-            "types": result.get("types", []),
-            "website": "",
-            "phone": "",
-            "email": []
-        }
-        
-        # Get additional details for each business
-        details_url = f"https://maps.googleapis.com/maps/api/place/details/json?place_id={business['place_id']}&fields=website,formatted_phone_number&key={google_places_key}"
-        details_response = requests.get(details_url)
-        details_data = details_response.json()
-        
-        if details_data.get("status") == "OK" and "result" in details_data:
-            business["website"] = details_data["result"].get("website", "")
-            business["phone"] = details_data["result"].get("formatted_phone_number", "")
-            
-            # Extract emails from website if available
-            if business["website"]:
-                try:
-                    # Try to get the website content
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                    }
-                    website_response = requests.get(business["website"], headers=headers, timeout=10)
-                    if website_response.status_code == 200:
-                        # Extract emails from the website content
-                        business["email"] = extract_emails_from_html(website_response.text)
-                        
-                        # If no emails found on the main page, try contact pages
-                        if not business["email"]:
-                            business["email"] = crawl_contact_pages(business["website"])
-                except Exception as e:
-                    logger.error(f"Error fetching website {business['website']}: {str(e)}")
-        
-        businesses.append(business)
-        time.sleep(1)  # Be nice to the API
-        
+    businesses = job_queue.results(job_id)
+    if job["status"] == "done":
+        if not businesses:
+            st.error("No businesses found. Please try another search query.")
+        else:
+            st.success(f"Found {len(businesses)} businesses!")
+        if job["metrics"]:
+            display_search_metrics(job["metrics"])
     return businesses
 
-# LLM Functions for Email Extraction
-def format_business_data_for_llm(business):
-    """Format business data as context for the LLM"""
-    context = f"""
-Name: {business.get('name', 'Unknown')}
-Address: {business.get('address', 'Unknown')}
-Website: {business.get('website', 'Unknown')}
-Phone: {business.get('phone', 'Unknown')}
-Business Types: {', '.join(business.get('types', ['Unknown']))}
-Emails Found: {', '.join(business.get('email', []))}
-    """
-    return context
-
-def extract_potential_emails_with_llm(business, openai_client):
-    """Use LLM to deduce or extract possible email addresses based on business context"""
-    if not openai_client:
-        return business.get("email", [])
-    
-    # If we already have emails, return them
-    if business.get("email"):
-        return business.get("email")
-    
-    context = format_business_data_for_llm(business)
-    
-    prompt = f"""You are an expert at deducing business email addresses. Based on the following business information, 
-    suggest the most likely email address formats for contacting this business. 
-    
-    {context}
-    
-    Based on common patterns for businesses of this type, suggest the 2 most likely email addresses. 
-    If you can't make a good suggestion, reply with "No email suggestion available."
-    Only provide email addresses that follow standard conventions and avoid any that might be incorrect.
-    If you previously found emails, prioritize those found emails. Do not make up emails that couldn't be correct.
-    
-    Most likely email addresses:
-    """
-    
-    try:
-        response = openai_client.chat.completions.create(
-            model="gpt-4.1",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that deduces business email addresses based on patterns."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=150
+def display_search_metrics(job_metrics):
+    """Show where a finished search spent its time, its counters and its profile if it has one"""
+    with st.expander(f"Search metrics ({job_metrics['wall_seconds']:.1f}s)"):
+        values = job_metrics["metrics"]
+        stages = sorted((
+            (name[len('stage_seconds_total{stage="'):-2], seconds)
+            for name, seconds in values.items() if name.startswith("stage_seconds_total{")
+        ), key=lambda stage: stage[1], reverse=True)
+        busy = sum(seconds for _, seconds in stages) or 1.0
+        st.write("**Time by stage** (summed over all worker threads)")
+        st.table([
+            {
+                "stage": stage,
+                "calls": values.get(f'stage_calls_total{{stage="{stage}"}}', 0),
+                "seconds": round(seconds, 3),
+                "share": f"{seconds / busy:.0%}"
+            }
+            for stage, seconds in stages
+        ])
+        st.write("**Counters**")
+        st.table([
+            {"metric": name, "value": f"{value:g}"}
+            for name, value in sorted(values.items()) if not name.startswith("stage_")
+        ])
+        if job_metrics.get("profile"):
+            st.write("**Profile**")
+            st.code(job_metrics["profile"], language=None)
+
+def submit_search(google_places_key):
+    """Queue the search form's query as a background job (runs once per click)"""
+    query = st.session_state.get("search_query")
+    if query and google_places_key:
+        job_id = get_job_queue().submit(
+            query, min(st.session_state["num_results"], PLACES_MAX_RESULTS),
+            profile=st.session_state.get("profile_search", False)
         )
-        
-        suggestions_text = response.choices[0].message.content.strip()
-        
-        # Extract valid email patterns from the response
-        extracted_emails = re.findall(r'[\w\.-]+@[\w\.-]+\.\w+', suggestions_text)
-        valid_emails = [email for email in extracted_emails if is_valid_email(email)]
-        
-        # If we already had emails found by crawling, prioritize those
-        existing_emails = business.get("email", [])
-        if existing_emails:
-            combined_emails = existing_emails + [e for e in valid_emails if e not in existing_emails]
-            return combined_emails
-        
-        return valid_emails
-    except Exception as e:
-        logger.error(f"Error using LLM for email suggestion: {str(e)}")
-        return business.get("email", [])
-
-# Export Functions
-def export_businesses_to_csv(businesses, filename="business_data.csv"):
-    """Export business data to CSV file"""
-    if not businesses:
-        return None
-        
-    # Prepare data for CSV
-    csv_data = []
-    for business in businesses:
-        row = {
-            'Name': business.get('name', ''),
-            'Address': business.get('address', ''),
-            'Website': business.get('website', ''),
-            'Phone': business.get('phone', ''),
-            'Types': ', '.join(business.get('types', [])),
-            'Emails': ', '.join(business.get('email', []))
-        }
-        csv_data.append(row)
-    
-    # Create DataFrame and export to CSV
-    df = pd.DataFrame(csv_data)
-    
-    # For in-memory file (Streamlit download)
-    csv_buffer = StringIO()
-    df.to_csv(csv_buffer, index=False)
-    csv_data = csv_buffer.getvalue()
-    
-    return csv_data
-
-def export_businesses_to_excel(businesses, filename="business_data.xlsx"):
-    """Export business data to Excel file"""
-    if not businesses:
-        return None
-        
-    # Prepare data for Excel
-    excel_data = []
-    for business in businesses:
-        row = {
-            'Name': business.get('name', ''),
-            'Address': business.get('address', ''),
-            'Website': business.get('website', ''),
-            'Phone': business.get('phone', ''),
-            'Types': ', '.join(business.get('types', [])),
-            'Emails': ', '.join(business.get('email', []))
-        }
-        excel_data.append(row)
-    
-    # Create DataFrame and export to Excel
-    df = pd.DataFrame(excel_data)
-    
-    # For in-memory file (Streamlit download)
-    excel_buffer = BytesIO()
-    df.to_excel(excel_buffer, index=False)
-    excel_data = excel_buffer.getvalue()
-    
-    return excel_data
-
-# Streamlit App Components
-def display_login_page():
-    st.title("SignalScout - Login")
-    st.markdown("Please log in to continue.")
-    password = st.text_input("Password", type="password")
-    login_button = st.button("Login")
-    
-    if login_button:
-        if authenticate(password):
-            st.session_state["authenticated"] = True
-            st.experimental_rerun()
-        else:
-            st.error("Invalid password!")
+        st.session_state["job_id"] = job_id
+        # The job id in the URL lets a reconnecting browser pick the search up again
+        st.query_params["job"] = str(job_id)
 
 def display_main_app():
     openai_api_key, google_places_key = setup_api_keys()
@@ -446,37 +142,26 @@ def display_main_app():
     st.title("SignalScout - Business Lead Generator")
     st.markdown("Extract business information and contact details from Google Places")
     
-    # Initialize OpenAI client if key is available
-    openai_client = None
-    if openai_api_key:
-        openai_client = OpenAI(api_key=openai_api_key)
+    # Searches run in background job workers, so reruns don't interrupt them
+    ensure_job_workers()
     
     # Search form
     with st.form("search_form"):
-        query = st.text_input("Enter search query (e.g., 'restaurants in Chicago')")
-        num_results = st.slider("Number of results", 1, 20, 5)
-        submitted = st.form_submit_button("Search")
-    
-    # Process search if submitted
-    if submitted and query and google_places_key:
-        with st.spinner("Searching for businesses..."):
-            businesses = extract_businesses_from_query(query, google_places_key, num_results)
-            
-            if not businesses:
-                st.error("No businesses found. Please try another search query.")
-            else:
-                # Store businesses in session state
-                st.session_state["businesses"] = businesses
-                
-                # Use LLM to enhance email extraction where needed
-                enhanced_businesses = []
-                for business in businesses:
-                    if openai_client:
-                        business["email"] = extract_potential_emails_with_llm(business, openai_client)
-                    enhanced_businesses.append(business)
-                
-                st.session_state["businesses"] = enhanced_businesses
-                st.success(f"Found {len(enhanced_businesses)} businesses!")
+        st.text_input("Enter search query (e.g., 'restaurants in Chicago')", key="search_query")
+        st.slider("Number of results", 1, PLACES_MAX_RESULTS, 5, key="num_results")
+        st.checkbox("Profile this search", key="profile_search",
+                    help="Sample where the search spends its time and show it under Search metrics")
+        st.form_submit_button("Search", on_click=submit_search, args=(google_places_key,))
+    
+    job_id = st.session_state.get("job_id") or st.query_params.get("job")
+    if job_id and not (str(job_id).isdecimal() and int(job_id) < 2 ** 63):
+        # A hand-edited link; anything else would crash int() or SQLite
+        del st.query_params["job"]
+        st.warning("That search link is not valid.")
+        job_id = None
+    if job_id:
+        job_id = int(job_id)
+        st.session_state["businesses"] = display_job(job_id)
     
     # Display results if available
     if "businesses" in st.session_state and st.session_state["businesses"]:
@@ -484,55 +169,33 @@ def display_main_app():
         
         # Export options
         st.subheader("Export Results")
-        col1, col2 = st.columns(2)
         
-        with col1:
-            if st.button("Export to CSV"):
-                csv_data = export_businesses_to_csv(businesses)
-                if csv_data:
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    filename = f"business_data_{timestamp}.csv"
-                    st.download_button(
-                        label="Download CSV",
-                        data=csv_data,
-                        file_name=filename,
-                        mime="text/csv"
-                    )
+        # Exports are built once per result set and kept for later reruns
+        exports = st.session_state.get("exports", {})
+        if exports.get("job_id") != job_id:
+            exports = st.session_state["exports"] = {"job_id": job_id}
         
-        with col2:
-            if st.button("Export to Excel"):
-                excel_data = export_businesses_to_excel(businesses)
-                if excel_data:
+        for column, (file_format, export_format) in zip(st.columns(len(EXPORT_FORMATS)), EXPORT_FORMATS.items()):
+            with column:
+                if file_format not in exports and st.button(f"Export to {export_format.label}"):
                     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    filename = f"business_data_{timestamp}.xlsx"
+                    exports[file_format] = (
+                        export_businesses(businesses, file_format),
+                        f"business_data_{timestamp}.{file_format}"
+                    )
+                if file_format in exports:
+                    data, filename = exports[file_format]
                     st.download_button(
-                        label="Download Excel",
-                        data=excel_data,
+                        label=f"Download {export_format.label}",
+                        data=data,
                         file_name=filename,
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        mime=export_format.mime
                     )
         
         # Display business details
         st.subheader("Search Results")
         for i, business in enumerate(businesses):
-            with st.expander(f"{i+1}. {business['name']}"):
-                st.write(f"**Address:** {business['address']}")
-                st.write(f"**Business Types:** {', '.join(business['types'])}")
-                
-                if business['website']:
-                    st.write(f"**Website:** [{business['website']}]({business['website']})")
-                else:
-                    st.write("**Website:** Not available")
-                    
-                if business['phone']:
-                    st.write(f"**Phone:** {business['phone']}")
-                else:
-                    st.write("**Phone:** Not available")
-                
-                if business['email']:
-                    st.write(f"**Emails:** {', '.join(business['email'])}")
-                else:
-                    st.write("**Emails:** Not found")
+            display_business(i, business)
 
 # Main App Flow
 def main():
@@ -0,0 +1,302 @@
+"""
+Offline benchmarks for SignalScout.
+
+Measures email extraction on the checked-in HTML corpus (in-process and
+through a pool of parse worker processes), contact page crawls against
+simulated local websites, the end-to-end search pipeline against a
+fake Places API, and how long a fresh process takes to import the
+pipeline and the UI. Nothing leaves the machine. Run from
+the repository root:
+
+    python -m benchmarks.run                  # compare with benchmarks/baseline.json
+    python -m benchmarks.run --quick          # shorter runs, for a smoke test
+    python -m benchmarks.run --save-baseline  # record the current numbers as the baseline
+
+The exit status is 1 when a metric regressed past the tolerance: a
+throughput drop or a latency or memory rise of more than --tolerance
+(25% by default), or any change in the number of emails found. Baselines are
+machine-specific; record one on the machine you compare on.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.servers import FakePlaces, SimulatedSites, load_corpus
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Benchmarks measure the pipeline itself: caches off, no Places page token wait
+BENCHMARK_ENV = {
+    "PAGE_CACHE_ENABLED": "0",
+    "API_CACHE_ENABLED": "0",
+    "LEAD_STORE_ENABLED": "0",
+    "PLACES_PAGE_TOKEN_DELAY": "0",
+    "PARSE_WORKERS": "0",
+}
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def summarize(latencies, elapsed, units, size_bytes=None, **extra):
+    """Throughput and p50/p95 latency for a list of per-unit latencies in seconds"""
+    result = {
+        f"{units}_per_sec": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+    }
+    if size_bytes is not None:
+        result["mb_per_sec"] = size_bytes / elapsed / 1e6
+    result.update(extra)
+    return result
+
+def bench_extractor(core, extract, min_seconds):
+    """Run an extractor over the HTML corpus repeatedly for at least min_seconds"""
+    pages = [page.decode("utf-8") for name, page in load_corpus().items() if name.endswith(".html")]
+    emails = sum(len(extract(page)) for page in pages)
+    latencies = []
+    size_bytes = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < min_seconds:
+        # Each pass validates its emails afresh, as new pages would
+        core.is_valid_email.cache_clear()
+        for page in pages:
+            page_started = time.perf_counter()
+            extract(page)
+            latencies.append(time.perf_counter() - page_started)
+            size_bytes += len(page)
+    return summarize(latencies, time.perf_counter() - started, "pages", size_bytes, emails=emails)
+
+def bench_parse_pool(core, min_seconds, workers):
+    """Analyze the HTML corpus through a pool of parse worker processes, as crawls with PARSE_WORKERS do"""
+    pages = [page.decode("utf-8") for name, page in load_corpus().items() if name.endswith(".html")]
+    pool = core.create_parse_pool(workers)
+
+    async def run():
+        parser = core.PageParser(pool, workers)
+        latencies = []
+
+        async def analyze(page):
+            page_started = time.perf_counter()
+            analysis = await parser.analyze(page)
+            latencies.append(time.perf_counter() - page_started)
+            return analysis
+
+        # The first pass starts the workers and isn't timed
+        analyses = await asyncio.gather(*(analyze(page) for page in pages * workers))
+        emails = sum(len(analysis["emails"]) for analysis in analyses[:len(pages)])
+        latencies.clear()
+        size_bytes = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < min_seconds:
+            await asyncio.gather(*(analyze(page) for page in pages * 4 * workers))
+            size_bytes += sum(len(page) for page in pages) * 4 * workers
+        return summarize(latencies, time.perf_counter() - started, "pages", size_bytes, emails=emails)
+
+    try:
+        return asyncio.run(run())
+    finally:
+        pool.shutdown()
+
+def bench_crawl(core, sites, count):
+    """Crawl the contact pages of the first count simulated sites, one site at a time"""
+    requests_before, bytes_before = sites.stats.snapshot()
+    latencies = []
+    emails = 0
+    started = time.perf_counter()
+    for url in sites.urls[:count]:
+        site_started = time.perf_counter()
+        emails += len(core.crawl_contact_pages(url))
+        latencies.append(time.perf_counter() - site_started)
+    elapsed = time.perf_counter() - started
+    requests_after, bytes_after = sites.stats.snapshot()
+    return summarize(
+        latencies, elapsed, "sites", bytes_after - bytes_before,
+        pages_per_sec=(requests_after - requests_before) / elapsed, emails=emails
+    )
+
+def bench_end_to_end(core, sites, places, queries, num_results):
+    """Run full searches: Places search and details, homepage fetches and contact crawls"""
+    requests_before, bytes_before = sites.stats.snapshot()
+    latencies = []
+    businesses = 0
+    emails = 0
+    started = time.perf_counter()
+    for number in range(queries):
+        query_started = time.perf_counter()
+        results = core.extract_businesses_from_query(f"benchmark businesses {number}", "benchmark-key", num_results)
+        latencies.append(time.perf_counter() - query_started)
+        businesses += len(results)
+        emails += sum(len(business["email"]) for business in results)
+    elapsed = time.perf_counter() - started
+    requests_after, bytes_after = sites.stats.snapshot()
+    return summarize(
+        latencies, elapsed, "queries", bytes_after - bytes_before,
+        businesses_per_sec=businesses / elapsed,
+        pages_per_sec=(requests_after - requests_before) / elapsed,
+        businesses=businesses, emails=emails
+    )
+
+# Modules a new process imports before it can work: the pipeline alone (job
+# workers, bulk runs, parse workers) and the Streamlit UI on top of it
+STARTUP_MODULES = {"core": "scout_core", "ui": "app"}
+
+STARTUP_SCRIPT = """
+import resource, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+try:
+    # Peak RSS of this process image; Linux carries ru_maxrss over from the forking parent
+    with open("/proc/self/status") as f:
+        rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+except OSError:
+    # ru_maxrss is in kilobytes, except on macOS where it is in bytes
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform == "darwin" else 1)
+print(elapsed * 1000, rss_kb / 1024)
+"""
+
+def bench_startup(runs):
+    """Import each of STARTUP_MODULES in fresh interpreters; median import time and peak RSS"""
+    result = {}
+    for name, module in STARTUP_MODULES.items():
+        import_ms, rss_mb = [], []
+        for _ in range(runs):
+            output = subprocess.run(
+                [sys.executable, "-c", STARTUP_SCRIPT.format(module=module)],
+                cwd=REPO_ROOT, capture_output=True, text=True, check=True
+            ).stdout
+            elapsed, rss = map(float, output.split())
+            import_ms.append(elapsed)
+            rss_mb.append(rss)
+        result[f"{name}_import_ms"] = statistics.median(import_ms)
+        result[f"{name}_rss_mb"] = statistics.median(rss_mb)
+    return result
+
+def compare(results, baseline, tolerance):
+    """Return (benchmark, metric, baseline, current) for every regressed metric"""
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            expected = baseline.get(name, {}).get(metric)
+            if expected is None:
+                continue
+            if metric.endswith("_per_sec"):
+                regressed = value < expected * (1 - tolerance)
+            elif metric.endswith(("_ms", "_mb")):
+                regressed = value > expected * (1 + tolerance)
+            else:
+                # Counts of results found: any change is a behavior change
+                regressed = value != expected
+            if regressed:
+                regressions.append((name, metric, expected, value))
+    return regressions
+
+def print_report(results, baseline):
+    print(f"{'benchmark':<14}{'metric':<20}{'current':>12}{'baseline':>12}{'change':>9}")
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            expected = baseline.get(name, {}).get(metric)
+            change = f"{(value / expected - 1) * 100:+.0f}%" if expected else ""
+            expected = f"{expected:.3f}" if expected is not None else "-"
+            print(f"{name:<14}{metric:<20}{value:>12.3f}{expected:>12}{change:>9}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline SignalScout benchmarks.")
+    parser.add_argument("--quick", action="store_true", help="shorter runs for a quick check")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown (default 0.25)")
+    parser.add_argument("--sites", type=int, default=60,
+                        help="simulated websites; end-to-end searches give each business its own site")
+    parser.add_argument("--crawl-sites", type=int, default=21, help="sites crawled by the crawl benchmark")
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated server latency in seconds")
+    parser.add_argument("--not-found-rate", type=float, default=0.1,
+                        help="chance that an existing contact page returns 404")
+    parser.add_argument("--queries", type=int, default=3, help="end-to-end searches to run")
+    parser.add_argument("--parse-workers", type=int, default=os.cpu_count(),
+                        help="processes for the parse_pool benchmark (default: one per core)")
+    parser.add_argument("--only", choices=["text", "html", "parse_pool", "crawl", "end_to_end", "startup"],
+                        action="append",
+                        help="run only these benchmarks (repeatable)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show the app's log output")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    selected = args.only or ["text", "html", "parse_pool", "crawl", "end_to_end", "startup"]
+    min_seconds = 0.3 if args.quick else 2.0
+    site_count = min(args.sites, 20) if args.quick else args.sites
+    crawl_count = min(args.crawl_sites, 7) if args.quick else args.crawl_sites
+    queries = 1 if args.quick else args.queries
+    num_results = 20 if args.quick else 60
+
+    sites = SimulatedSites(site_count, latency=args.latency, not_found_rate=args.not_found_rate)
+    places = FakePlaces(sites, latency=args.latency)
+    for name, value in BENCHMARK_ENV.items():
+        os.environ[name] = value
+    os.environ["GOOGLE_PLACES_BASE_URL"] = places.base_url
+    import scout_core as core
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.CRITICAL)
+
+    results = {}
+    try:
+        if "text" in selected:
+            results["text"] = bench_extractor(core, core.extract_emails_from_text, min_seconds)
+        if "html" in selected:
+            results["html"] = bench_extractor(core, core.extract_emails_from_html, min_seconds)
+        if "parse_pool" in selected:
+            results["parse_pool"] = bench_parse_pool(core, min_seconds, args.parse_workers)
+        if "crawl" in selected:
+            results["crawl"] = bench_crawl(core, sites, crawl_count)
+        if "end_to_end" in selected:
+            results["end_to_end"] = bench_end_to_end(core, sites, places, queries, num_results)
+        if "startup" in selected:
+            results["startup"] = bench_startup(3 if args.quick else 7)
+    finally:
+        places.close()
+        sites.close()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    # Quick runs and non-default setups aren't comparable with the stored numbers
+    settings = {"quick": args.quick, "sites": site_count, "crawl_sites": crawl_count, "latency": args.latency,
+                "not_found_rate": args.not_found_rate, "queries": queries}
+    comparable = baseline.get("settings") == settings
+    print_report(results, baseline if comparable else {})
+
+    if args.save_baseline:
+        baseline = dict(baseline if comparable else {}, **results)
+        baseline["settings"] = settings
+        baseline["recorded"] = {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+        }
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not comparable:
+        print("No baseline recorded with these settings; nothing to compare.")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for name, metric, expected, value in regressions:
+        print(f"REGRESSION {name}.{metric}: {value:.2f} vs baseline {expected:.2f}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""
+Local stand-ins for the network the pipeline talks to: simulated business
+websites serving the HTML corpus, and a fake Google Places API.
+
+Every simulated site listens on its own port, so the crawler's per-host
+politeness limits treat them as separate hosts, just like real websites.
+"""
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+# Page layouts of the simulated sites; any other path is a 404
+SITE_PROFILES = [
+    {"name": "Bright Smile Dental", "types": ["dentist", "health"],
+     "pages": {"/": "dental_home.html", "/contact-us": "dental_contact.html"}},
+    {"name": "Golden Crust Bakery", "types": ["bakery", "food"],
+     "pages": {"/": "bakery_home.html"}},
+    {"name": "Whitfield & Ames LLP", "types": ["lawyer"],
+     "pages": {"/": "law_home.html", "/about/contact": "law_contact.html"}},
+    {"name": "RapidFlow Plumbing", "types": ["plumber"],
+     "pages": {"/": "plumbing_home.html", "/get-in-touch": "plumbing_contact.html"}},
+    {"name": "Luxe & Co. Hair Studio", "types": ["hair_care", "beauty_salon"],
+     "pages": {"/": "salon_home.html", "/connect": "salon_connect.html"}},
+    {"name": "Ironworks Strength & Conditioning", "types": ["gym", "health"],
+     "pages": {"/": "gym_home.html"}},
+    {"name": "Numbersmith CPA", "types": ["accounting", "finance"],
+     "pages": {"/": "accounting_home.html", "/meet-the-team": "accounting_team.html",
+               "/sitemap.xml": "sitemap_accounting.xml"}},
+]
+
+def load_corpus():
+    """Return {file name: bytes} for every page in the corpus"""
+    corpus = {}
+    for name in sorted(os.listdir(CORPUS_DIR)):
+        with open(os.path.join(CORPUS_DIR, name), "rb") as f:
+            corpus[name] = f.read()
+    return corpus
+
+class ServerStats:
+    """Request and byte counters shared by all simulated servers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.bytes = 0
+
+    def add(self, size):
+        with self._lock:
+            self.requests += 1
+            self.bytes += size
+
+    def snapshot(self):
+        with self._lock:
+            return self.requests, self.bytes
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _delay(self):
+        latency, jitter = self.server.latency, self.server.jitter
+        if latency:
+            time.sleep(latency * self.server.random.uniform(1 - jitter, 1 + jitter))
+
+    def _send(self, status, body, content_type, head=False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if head:
+            body = b""
+        self.wfile.write(body)
+        self.server.stats.add(len(body))
+
+class _SiteHandler(_Handler):
+    def do_GET(self, head=False):
+        self._delay()
+        server = self.server
+        path = urlsplit(self.path).path
+        page = server.pages.get(path)
+        # Deterministic per path, so repeated runs see the same broken pages
+        if path != "/" and random.Random(f"{server.site_index}:{path}").random() < server.not_found_rate:
+            page = None
+        if page is None:
+            self._send(404, b"<html><body><h1>Page not found</h1></body></html>", "text/html; charset=utf-8", head)
+        elif path.endswith(".xml"):
+            self._send(200, page, "application/xml", head)
+        else:
+            self._send(200, page, "text/html; charset=utf-8", head)
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+class _PlacesHandler(_Handler):
+    def do_GET(self):
+        self._delay()
+        parts = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        if parts.path.endswith("/textsearch/json"):
+            body = self.server.places.text_search(params.get("query", ""), params.get("pagetoken"))
+        elif parts.path.endswith("/details/json"):
+            body = self.server.places.details(params.get("place_id", ""))
+        else:
+            self._send(404, b"{}", "application/json")
+            return
+        self._send(200, json.dumps(body).encode("utf-8"), "application/json")
+
+def _serve(handler, latency, jitter, stats, seed, **attributes):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.jitter = jitter
+    server.stats = stats
+    server.random = random.Random(seed)
+    for name, value in attributes.items():
+        setattr(server, name, value)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class SimulatedSites:
+    """
+    A set of local business websites built from the corpus. Each request
+    waits latency seconds (+/- jitter as a fraction), and each existing page
+    other than the homepage is a 404 with probability not_found_rate.
+    """
+
+    def __init__(self, count, latency=0.0, jitter=0.5, not_found_rate=0.0, seed=0):
+        corpus = load_corpus()
+        self.stats = ServerStats()
+        self.servers = []
+        self.sites = []
+        for index in range(count):
+            profile = SITE_PROFILES[index % len(SITE_PROFILES)]
+            server = _serve(_SiteHandler, latency, jitter, self.stats, seed + index,
+                            pages={}, not_found_rate=not_found_rate, site_index=index)
+            base_url = f"http://127.0.0.1:{server.server_port}/"
+            for path, name in profile["pages"].items():
+                server.pages[path] = corpus[name].replace(b"{base}", base_url.encode("ascii"))
+            self.servers.append(server)
+            self.sites.append(dict(profile, url=base_url))
+
+    @property
+    def urls(self):
+        return [site["url"] for site in self.sites]
+
+    def close(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+class FakePlaces:
+    """
+    Fake Places text search and details endpoints. Every query returns
+    max_results businesses, page_size per page, spread across the simulated
+    sites; one in website_gap businesses has no website.
+    """
+
+    def __init__(self, sites, latency=0.0, jitter=0.5, max_results=60, page_size=20, website_gap=8, seed=0):
+        self.sites = sites
+        self.max_results = max_results
+        self.page_size = page_size
+        self.website_gap = website_gap
+        self.stats = ServerStats()
+        self.server = _serve(_PlacesHandler, latency, jitter, self.stats, seed, places=self)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def _site(self, query_hash, index):
+        return self.sites.sites[(query_hash + index) % len(self.sites.sites)]
+
+    def text_search(self, query, page_token=None):
+        query_hash = zlib.crc32(query.encode("utf-8"))
+        start = int(page_token or 0) * self.page_size
+        results = []
+        for index in range(start, min(start + self.page_size, self.max_results)):
+            site = self._site(query_hash, index)
+            results.append({
+                "place_id": f"{query_hash:08x}-{index}",
+                "name": f"{site['name']} #{index}",
+                "formatted_address": f"{100 + index} Main St",
+                "types": site["types"],
+            })
+        response = {"status": "OK" if results else "ZERO_RESULTS", "results": results}
+        if start + self.page_size < self.max_results:
+            response["next_page_token"] = str(start // self.page_size + 1)
+        return response
+
+    def details(self, place_id):
+        query_hash, _, index = place_id.partition("-")
+        try:
+            query_hash, index = int(query_hash, 16), int(index)
+        except ValueError:
+            return {"status": "NOT_FOUND"}
+        result = {"formatted_phone_number": f"(555) 010-{index:04d}"}
+        if index % self.website_gap:
+            result["website"] = self._site(query_hash, index)["url"]
+        return {"status": "OK", "result": result}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,260 @@
+"""
+Headless bulk runner for SignalScout.
+
+Reads search queries from a file (one per line, '#' starts a comment), runs
+them through the concurrent enrichment pipeline in scout_core.py and streams each
+business to a JSON Lines file as soon as it is enriched. Progress is
+checkpointed to SQLite, so a killed run picks up where it stopped:
+finished queries are skipped and half-finished ones only enrich the
+businesses that are still missing. Businesses and websites already in the
+lead store are only crawled again once they are older than --stale-after.
+
+    GOOGLE_PLACES_KEY=... python bulk_run.py queries.txt -o leads.jsonl --export leads.xlsx
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+
+import scout_core
+
+logger = logging.getLogger("bulk_run")
+
+BULK_CHECKPOINT_PATH = os.environ.get("BULK_CHECKPOINT_PATH", os.path.join(".scout_cache", "bulk.sqlite3"))
+BULK_QUERY_CONCURRENCY = int(os.environ.get("BULK_QUERY_CONCURRENCY", "3"))
+
+class BulkCheckpoint:
+    """Records which queries are finished and which businesses each query has produced"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS queries (
+                query TEXT PRIMARY KEY,
+                businesses INTEGER NOT NULL,
+                finished_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS businesses (
+                query TEXT NOT NULL,
+                place_id TEXT NOT NULL,
+                PRIMARY KEY (query, place_id)
+            );
+        """)
+
+    def finished_queries(self):
+        return {row[0] for row in self.conn.execute("SELECT query FROM queries")}
+
+    def done_place_ids(self, query):
+        rows = self.conn.execute("SELECT place_id FROM businesses WHERE query = ?", (query,))
+        return {row[0] for row in rows}
+
+    def record_business(self, query, place_id):
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO businesses (query, place_id) VALUES (?, ?)", (query, place_id))
+
+    def finish_query(self, query):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO queries (query, businesses, finished_at) "
+                "SELECT ?, COUNT(*), ? FROM businesses WHERE query = ?",
+                (query, time.time(), query)
+            )
+
+    def close(self):
+        self.conn.close()
+
+def read_queries(path):
+    """Read unique, non-empty queries from a file, keeping their order"""
+    with open(path, encoding="utf-8") as f:
+        queries = (line.split("#", 1)[0].strip() for line in f)
+        return list(dict.fromkeys(query for query in queries if query))
+
+def read_businesses(lines):
+    """Stream businesses back from JSON Lines output, skipping rows repeated by a resumed run"""
+    seen = set()
+    for line in lines:
+        business = json.loads(line)
+        key = (business["query"], business["place_id"])
+        if key not in seen:
+            seen.add(key)
+            yield business
+
+class BulkRun:
+    """Runs queries concurrently, streaming businesses to the output and the checkpoint"""
+
+    def __init__(self, checkpoint, output, google_places_key, num_results, concurrency,
+                 api_workers=None, site_workers=None):
+        self.checkpoint = checkpoint
+        self.output = output
+        self.google_places_key = google_places_key
+        self.num_results = min(num_results, scout_core.PLACES_MAX_RESULTS)
+        self.concurrency = concurrency
+        self.api_workers = api_workers
+        self.site_workers = site_workers
+        # Chains turn up under many queries; each domain is crawled once per run
+        self.domains = scout_core.DomainRegistry()
+        # One crawl engine and API semaphore for all queries, created by run(),
+        # so the crawl and API limits hold for the run as a whole
+        self.engine = None
+        self.api_slots = None
+        self.businesses = 0
+        self.queries = 0
+        self.started = time.monotonic()
+
+    def rate(self):
+        """Throughput in businesses per minute since the run started"""
+        elapsed = time.monotonic() - self.started
+        return self.businesses * 60 / elapsed if elapsed else 0.0
+
+    async def run_query(self, query):
+        skip_place_ids = self.checkpoint.done_place_ids(query)
+        found = 0
+        events = scout_core.stream_search_and_enrich(
+            query, self.google_places_key, self.num_results, self.api_workers, self.site_workers,
+            skip_place_ids=skip_place_ids, engine=self.engine, api_slots=self.api_slots
+        )
+        async for event in events:
+            row = {"query": query, "rank": event.index + 1, **event.business}
+            # Written before the checkpoint: a kill in between repeats a row rather than losing it
+            self.output.write(json.dumps(row, ensure_ascii=False) + "\n")
+            self.output.flush()
+            self.checkpoint.record_business(query, event.business["place_id"])
+            self.businesses += 1
+            found += 1
+        self.checkpoint.finish_query(query)
+        self.queries += 1
+        logger.info(
+            f"[{self.queries}] {query!r}: {found} new businesses "
+            f"({len(skip_place_ids)} from an earlier run); {self.rate():.1f} businesses/min"
+        )
+
+    async def run(self, queries):
+        pending = asyncio.Queue()
+        for query in queries:
+            pending.put_nowait(query)
+
+        async def worker():
+            while not pending.empty():
+                query = pending.get_nowait()
+                try:
+                    await self.run_query(query)
+                except Exception as e:
+                    # Left unfinished in the checkpoint, so the next run retries it
+                    logger.error(f"Query {query!r} failed: {str(e)}")
+
+        self.api_slots = asyncio.Semaphore(self.api_workers or scout_core.GOOGLE_API_CONCURRENCY)
+        async with scout_core.CrawlEngine(domains=self.domains) as self.engine:
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(queries)))))
+        scout_core.log_crawl_stats(self.engine)
+
+def log_stage_summary(values):
+    """Log the run's time per pipeline stage, largest first"""
+    prefix = 'stage_seconds_total{stage="'
+    stages = {name[len(prefix):-2]: seconds for name, seconds in values.items() if name.startswith(prefix)}
+    busy = sum(stages.values()) or 1.0
+    for stage, seconds in sorted(stages.items(), key=lambda item: item[1], reverse=True):
+        calls = values.get(f'stage_calls_total{{stage="{stage}"}}', 0)
+        logger.info(f"Stage {stage}: {seconds:.1f}s over {calls} calls ({seconds / busy:.0%})")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run SignalScout searches in bulk without the Streamlit UI.")
+    parser.add_argument("queries", help="file with one search query per line")
+    parser.add_argument("-o", "--output", default="-", help="JSON Lines output file, appended to (default: stdout)")
+    parser.add_argument("--checkpoint", default=BULK_CHECKPOINT_PATH, help="SQLite checkpoint used to resume runs")
+    parser.add_argument("-n", "--num-results", type=int, default=scout_core.PLACES_MAX_RESULTS,
+                        help="businesses per query (max %(default)s)")
+    parser.add_argument("-c", "--concurrency", type=int, default=BULK_QUERY_CONCURRENCY,
+                        help="queries processed at the same time")
+    parser.add_argument("--api-workers", type=int, help="concurrent Google Places requests per query")
+    parser.add_argument("--site-workers", type=int, help="concurrent website crawls per query")
+    parser.add_argument("--parse-workers", type=int, default=scout_core.PARSE_WORKERS,
+                        help="processes that parse pages, e.g. the number of cores (default: PARSE_WORKERS, "
+                             "0 parses on the crawl threads)")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and run every query again")
+    parser.add_argument("--stale-after", type=float, metavar="DAYS", default=scout_core.LEAD_STALE_AFTER / 86400,
+                        help="re-crawl businesses and websites stored in the lead store longer ago than this "
+                             "(default %(default)g; 0 re-crawls everything)")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port during the run")
+    parser.add_argument("--metrics-host", default=scout_core.METRICS_HOST,
+                        help="interface for --metrics-port (default %(default)s; 0.0.0.0 for all interfaces)")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="sample the run's stacks and write them to PATH as collapsed stacks for a flame graph")
+    parser.add_argument("--export", metavar="PATH",
+                        help="after the run, export the output file to PATH; the format follows the extension "
+                             f"({', '.join(scout_core.EXPORT_FORMATS)})")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    _, google_places_key = scout_core.setup_api_keys()
+    if not google_places_key:
+        logger.error("GOOGLE_PLACES_KEY is not set")
+        return 2
+
+    export_format = None
+    if args.export:
+        export_format = os.path.splitext(args.export)[1].lstrip(".").lower()
+        if export_format not in scout_core.EXPORT_FORMATS:
+            logger.error(f"Can't export to {args.export}: supported formats are {', '.join(scout_core.EXPORT_FORMATS)}")
+            return 2
+        if args.output == "-":
+            logger.error("--export needs --output to be a file")
+            return 2
+
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    checkpoint = BulkCheckpoint(args.checkpoint)
+    queries = read_queries(args.queries)
+    finished = checkpoint.finished_queries()
+    pending = [query for query in queries if query not in finished]
+    logger.info(f"{len(queries)} queries, {len(queries) - len(pending)} already finished, {len(pending)} to run")
+
+    scout_core.PARSE_WORKERS = args.parse_workers
+    scout_core.LEAD_STALE_AFTER = args.stale_after * 86400
+    if args.metrics_port:
+        scout_core.start_metrics_server(args.metrics_port, args.metrics_host)
+    profiler = scout_core.SamplingProfiler() if args.profile else None
+    before = scout_core.metrics.snapshot()
+
+    output = sys.stdout if args.output == "-" else open(args.output, "a", encoding="utf-8")
+    run = BulkRun(checkpoint, output, google_places_key, args.num_results, args.concurrency,
+                  args.api_workers, args.site_workers)
+    try:
+        with profiler or contextlib.nullcontext():
+            asyncio.run(run.run(pending))
+    except KeyboardInterrupt:
+        logger.info("Interrupted; rerun the same command to resume")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        checkpoint.close()
+        scout_core.log_fetch_stats()
+        log_stage_summary(scout_core.metrics.summary(before))
+        if profiler is not None:
+            profiler.write_collapsed(args.profile)
+            logger.info(f"Profile written to {args.profile}\n{profiler.report()}")
+
+    logger.info(
+        f"Done: {run.queries} queries, {run.businesses} businesses in "
+        f"{time.monotonic() - run.started:.0f}s ({run.rate():.1f} businesses/min); "
+        f"domains: {run.domains.stats()}"
+    )
+
+    if export_format:
+        with open(args.output, encoding="utf-8") as f:
+            scout_core.export_businesses(read_businesses(f), export_format, args.export)
+        logger.info(f"Exported {args.output} to {args.export}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
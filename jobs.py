@@ -0,0 +1,322 @@
+"""
+Background search jobs for SignalScout.
+
+Searches are queued in SQLite and run by worker processes, outside the
+Streamlit script thread. Reruns, other sessions and browser disconnects
+therefore don't interrupt them. Workers write each enriched business to
+the store as it arrives, and the UI polls job status and partial results.
+A job whose worker dies is picked up again by another worker, which only
+enriches the businesses still missing.
+
+Workers are normally started by the app (JOB_WORKERS per server process).
+With JOB_WORKERS=0 they can be run separately instead:
+
+    python jobs.py worker -n 4
+"""
+import argparse
+import atexit
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+JOB_DB_PATH = os.environ.get("JOB_DB_PATH", os.path.join(".scout_cache", "jobs.sqlite3"))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))  # worker processes started by the app
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "1.0"))
+JOB_HEARTBEAT_INTERVAL = float(os.environ.get("JOB_HEARTBEAT_INTERVAL", "10"))
+JOB_STALE_AFTER = float(os.environ.get("JOB_STALE_AFTER", "120"))  # requeue running jobs silent this long
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+
+ACTIVE_STATUSES = ("queued", "running")
+
+class JobQueue:
+    """SQLite-backed queue of search jobs and the businesses each job has produced"""
+
+    def __init__(self, path=None):
+        self.path = path or JOB_DB_PATH
+        self._lock = threading.Lock()
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Autocommit mode, so claim() can take an immediate write lock across processes
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                query TEXT NOT NULL,
+                num_results INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                completed INTEGER NOT NULL DEFAULT 0,
+                discovered INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                worker_pid INTEGER,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                heartbeat_at REAL,
+                finished_at REAL,
+                profile INTEGER NOT NULL DEFAULT 0,
+                metrics TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+            CREATE TABLE IF NOT EXISTS job_businesses (
+                job_id INTEGER NOT NULL,
+                rank INTEGER NOT NULL,
+                place_id TEXT NOT NULL,
+                business TEXT NOT NULL,
+                PRIMARY KEY (job_id, rank)
+            );
+        """)
+        # Job stores created before per-search metrics lack these columns
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if "profile" not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN profile INTEGER NOT NULL DEFAULT 0")
+        if "metrics" not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN metrics TEXT")
+
+    def submit(self, query, num_results, profile=False):
+        """Queue a search and return its job id; profile=True also samples where its time goes"""
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO jobs (query, num_results, status, created_at, profile) VALUES (?, ?, 'queued', ?, ?)",
+                (query, num_results, time.time(), int(profile))
+            )
+        return cursor.lastrowid
+
+    def get(self, job_id):
+        """Return a job's status, progress and metrics as a dict, or None if it doesn't exist"""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["metrics"] = json.loads(job["metrics"]) if job["metrics"] else None
+        return job
+
+    def results(self, job_id):
+        """Return the businesses a job has produced so far, in Places ranking order"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT business FROM job_businesses WHERE job_id = ? ORDER BY rank", (job_id,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; a running worker stops at its next business"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status IN (?, ?)",
+                (time.time(), job_id, *ACTIVE_STATUSES)
+            )
+
+    def claim(self, worker_pid):
+        """Take the oldest queued job for a worker, or return None if there is none"""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs whose worker stopped sending heartbeats go back in the queue
+                self._db.execute(
+                    "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                    "error = CASE WHEN attempts >= ? THEN 'worker stopped responding' ELSE error END "
+                    "WHERE status = 'running' AND heartbeat_at < ?",
+                    (JOB_MAX_ATTEMPTS, JOB_MAX_ATTEMPTS, now - JOB_STALE_AFTER)
+                )
+                row = self._db.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker_pid = ?, "
+                        "started_at = COALESCE(started_at, ?), heartbeat_at = ? WHERE id = ?",
+                        (worker_pid, now, now, row["id"])
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return dict(row) if row else None
+
+    def done_place_ids(self, job_id):
+        with self._lock:
+            rows = self._db.execute("SELECT place_id FROM job_businesses WHERE job_id = ?", (job_id,))
+            return {row[0] for row in rows}
+
+    def record_business(self, job_id, rank, business, completed, discovered):
+        """Store one enriched business and the job's progress; returns the job's status"""
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.execute(
+                "INSERT OR REPLACE INTO job_businesses VALUES (?, ?, ?, ?)",
+                (job_id, rank, business["place_id"], json.dumps(business))
+            )
+            self._db.execute(
+                "UPDATE jobs SET completed = ?, discovered = ?, heartbeat_at = ? WHERE id = ?",
+                (completed, discovered, time.time(), job_id)
+            )
+            self._db.execute("COMMIT")
+            return self._db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+
+    def update_businesses(self, job_id, businesses):
+        """Overwrite a job's stored businesses in place, e.g. after the LLM stage"""
+        with self._lock:
+            self._db.execute("BEGIN")
+            for business in businesses:
+                self._db.execute(
+                    "UPDATE job_businesses SET business = ? WHERE job_id = ? AND place_id = ?",
+                    (json.dumps(business), job_id, business["place_id"])
+                )
+            self._db.execute("COMMIT")
+
+    def heartbeat(self, job_id):
+        with self._lock:
+            self._db.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def finish(self, job_id, status, error=None, metrics=None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, metrics = ? WHERE id = ? AND status = 'running'",
+                (status, error, time.time(), json.dumps(metrics) if metrics else None, job_id)
+            )
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """Return the process-wide job queue"""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+        return _job_queue
+
+# Workers
+def _heartbeat_while(queue, job_id, stop):
+    while not stop.wait(JOB_HEARTBEAT_INTERVAL):
+        queue.heartbeat(job_id)
+
+def run_job(queue, job):
+    """Run one claimed job, storing each business as soon as it is enriched"""
+    import scout_core
+
+    openai_api_key, google_places_key = scout_core.setup_api_keys()
+    job_id = job["id"]
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat_while, args=(queue, job_id, stop), daemon=True)
+    heartbeat.start()
+    # A worker runs one job at a time, so what its metrics gain meanwhile belongs to this job
+    before = scout_core.metrics.snapshot()
+    started = time.perf_counter()
+    profiler = scout_core.SamplingProfiler() if job["profile"] else None
+    try:
+        if not google_places_key:
+            raise RuntimeError("GOOGLE_PLACES_KEY is not set")
+
+        with profiler or contextlib.nullcontext():
+            # Businesses stored by an earlier, interrupted attempt are not enriched again
+            events = scout_core.iter_businesses_from_query(
+                job["query"], google_places_key, job["num_results"], skip_place_ids=queue.done_place_ids(job_id)
+            )
+            for event in events:
+                status = queue.record_business(job_id, event.index, event.business, event.completed, event.discovered)
+                if status != "running":
+                    events.close()
+                    logger.info(f"Job {job_id} {status}, stopping")
+                    return
+
+            # Use LLM to enhance email extraction where needed
+            if openai_api_key:
+                businesses = queue.results(job_id)
+                openai_client = scout_core.create_openai_client(openai_api_key)
+                suggested_emails = scout_core.suggest_emails_with_llm(businesses, openai_client)
+                for business, emails in zip(businesses, suggested_emails):
+                    business["email"] = emails
+                queue.update_businesses(job_id, businesses)
+
+        job_metrics = {"wall_seconds": time.perf_counter() - started, "metrics": scout_core.metrics.summary(before)}
+        if profiler is not None:
+            job_metrics["profile"] = profiler.report()
+        queue.finish(job_id, "done", metrics=job_metrics)
+        logger.info(f"Job {job_id} done in {job_metrics['wall_seconds']:.1f}s: {job['query']!r}")
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {str(e)}")
+        queue.finish(job_id, "failed", str(e))
+    finally:
+        stop.set()
+
+def run_worker(path=None, poll_interval=None):
+    """Claim and run jobs until the process is stopped"""
+    queue = JobQueue(path)
+    poll_interval = poll_interval or JOB_POLL_INTERVAL
+    logger.info(f"Job worker {os.getpid()} started")
+    while True:
+        job = queue.claim(os.getpid())
+        if job is None:
+            time.sleep(poll_interval)
+        else:
+            run_job(queue, job)
+
+def _spawn_worker(path):
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), "worker", "--db", os.path.abspath(path)])
+
+_workers = []
+_workers_lock = threading.Lock()
+
+def ensure_job_workers(count=None, path=None):
+    """Start this process's worker pool, replacing workers that have exited"""
+    count = JOB_WORKERS if count is None else count
+    path = path or JOB_DB_PATH
+    with _workers_lock:
+        if not _workers and count:
+            atexit.register(stop_job_workers)
+        for index in range(count):
+            if index == len(_workers):
+                _workers.append(_spawn_worker(path))
+            elif _workers[index].poll() is not None:
+                logger.error(f"Job worker {_workers[index].pid} exited, restarting it")
+                _workers[index] = _spawn_worker(path)
+
+def stop_job_workers():
+    with _workers_lock:
+        for worker in _workers:
+            worker.terminate()
+        for worker in _workers:
+            worker.wait()
+        _workers.clear()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SignalScout background job workers.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    worker_parser = subcommands.add_parser("worker", help="run job workers in the foreground")
+    worker_parser.add_argument("-n", "--workers", type=int, default=1, help="worker processes to run")
+    worker_parser.add_argument("--db", default=JOB_DB_PATH, help="job database path")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.workers == 1:
+        try:
+            run_worker(args.db)
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    ensure_job_workers(args.workers, args.db)
+    try:
+        while True:
+            time.sleep(JOB_POLL_INTERVAL * 5)
+            ensure_job_workers(args.workers, args.db)
+    except KeyboardInterrupt:
+        stop_job_workers()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2552 @@
+"""
+The SignalScout search pipeline: Places search, website crawling, email
+extraction and validation, LLM suggestions and exports.
+
+Used by the Streamlit UI (app.py), the job workers, the bulk runner and the
+parse worker processes. It imports without streamlit, and the heavier
+libraries (openai, openpyxl, pyarrow, BeautifulSoup, email_validator) are
+only imported when first used, so short-lived processes start quickly.
+"""
+import re
+import asyncio
+import functools
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+import time
+import os
+import io
+from urllib.parse import urlparse, urlsplit, urlunsplit, parse_qsl, urlencode, quote_plus
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import logging
+import threading
+import sqlite3
+import collections
+import json
+import heapq
+import itertools
+import html
+import hashlib
+import contextlib
+import sys
+import ipaddress
+import socket
+import importlib.util
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Configuration
+def setup_api_keys():
+    openai_api_key = os.environ.get("OPENAI_API_KEY", "")
+    google_places_key = os.environ.get("GOOGLE_PLACES_KEY", "")
+    return openai_api_key, google_places_key
+
+# Metrics
+# Stage timers and counters for every process that runs searches. Timers
+# record exclusive time (time spent in nested stages is subtracted), so the
+# stages of a search add up instead of double counting. Set METRICS_DIR to
+# have each process write a Prometheus text file after every search.
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")  # interface the metrics endpoint listens on
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", "0.005"))
+
+class MetricsRegistry:
+    """Thread-safe counters and stage timers, rendered in Prometheus text format"""
+
+    def __init__(self, prefix="signalscout"):
+        self.prefix = prefix
+        self.counters = collections.Counter()  # (name, labels) -> value
+        self.stages = collections.defaultdict(lambda: [0, 0.0])  # stage -> [calls, seconds]
+        self.collectors = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] += value
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            totals = self.stages[stage]
+            totals[0] += 1
+            totals[1] += seconds
+
+    @contextlib.contextmanager
+    def timer(self, stage):
+        """Time a synchronous block as one call of stage; don't hold it across an await"""
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.observe(stage, elapsed - nested)
+
+    def drain(self):
+        """Return and reset the counters and stages, e.g. to ship a worker process's metrics to its parent"""
+        with self._lock:
+            drained = (self.counters, {stage: tuple(totals) for stage, totals in self.stages.items()})
+            self.counters = collections.Counter()
+            self.stages.clear()
+        return drained
+
+    def merge(self, drained):
+        """Add metrics returned by another registry's drain()"""
+        counters, stages = drained
+        with self._lock:
+            self.counters.update(counters)
+            for stage, (calls, seconds) in stages.items():
+                totals = self.stages[stage]
+                totals[0] += calls
+                totals[1] += seconds
+
+    def register_collector(self, name, collect):
+        """Include the dict returned by collect() (e.g. a cache's stats) in every snapshot"""
+        self.collectors[name] = collect
+
+    def snapshot(self):
+        """Current values of every counter and stage, keyed by Prometheus-style names"""
+        values = {}
+        with self._lock:
+            for (name, labels), value in self.counters.items():
+                values[_metric_key(name, labels)] = value
+            for stage, (calls, seconds) in self.stages.items():
+                values[_metric_key("stage_calls_total", (("stage", stage),))] = calls
+                values[_metric_key("stage_seconds_total", (("stage", stage),))] = seconds
+        for collector, collect in list(self.collectors.items()):
+            for name, value in collect().items():
+                values[f"{collector}_{name}"] = value
+        return values
+
+    def summary(self, before):
+        """What changed since an earlier snapshot(): the metrics of one search"""
+        after = self.snapshot()
+        changes = {name: value - before.get(name, 0) for name, value in after.items()}
+        return {name: value for name, value in changes.items() if value}
+
+    def render(self):
+        """The current snapshot in the Prometheus text exposition format"""
+        lines = []
+        for name, value in sorted(self.snapshot().items()):
+            lines.append(f"{self.prefix}_{name} {value:g}" if isinstance(value, float) else f"{self.prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, directory=None):
+        """Atomically write this process's metrics to <directory>/signalscout_<pid>.prom"""
+        directory = directory or METRICS_DIR
+        if not directory:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.prefix}_{os.getpid()}.prom")
+        with open(path + ".tmp", "w") as f:
+            f.write(self.render())
+        os.replace(path + ".tmp", path)
+        return path
+
+def _metric_key(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+metrics = MetricsRegistry()
+
+def start_metrics_server(port, host=None, registry=None):
+    """Serve registry.render() at http://<host>:<port>/metrics from a background thread"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    registry = registry or metrics
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    host = host or METRICS_HOST
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+    logger.info(f"Serving metrics on {host}:{port}")
+    return server
+
+# Frames where a sampled thread is idle rather than working
+IDLE_FRAMES = frozenset([("thread.py", "_worker"), ("threading.py", "wait"), ("selectors.py", "select")])
+
+class SamplingProfiler:
+    """
+    Opt-in profiler for a single run. It samples the stacks of every thread
+    at a fixed interval. cProfile only sees the thread it is enabled in,
+    which here would miss the crawl pool where fetching and parsing happen.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval or PROFILE_INTERVAL
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True, name="profiler")
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self):
+        own_thread = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((os.path.basename(code.co_filename), code.co_name, code.co_firstlineno))
+                    frame = frame.f_back
+                if stack[0][:2] not in IDLE_FRAMES:
+                    self.stacks[tuple(reversed(stack))] += 1
+
+    def report(self, limit=25):
+        """The functions seen most often, by self and total share of busy samples"""
+        samples = sum(self.stacks.values())
+        if not samples:
+            return "No busy samples recorded"
+        own = collections.Counter()
+        total = collections.Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                total[function] += count
+        lines = [f"{samples} busy samples every {self.interval * 1000:g} ms", f"{'self':>6} {'total':>6}  function"]
+        for function, count in own.most_common(limit):
+            filename, name, line = function
+            lines.append(f"{count / samples:6.1%} {total[function] / samples:6.1%}  {name} ({filename}:{line})")
+        return "\n".join(lines)
+
+    def write_collapsed(self, path):
+        """Write the samples as collapsed stacks, the input format of flame graph tools"""
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                frames = ";".join(f"{name} ({filename}:{line})" for filename, name, line in stack)
+                f.write(f"{frames} {count}\n")
+
+# HTTP Client
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "10"))
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "2"))
+HTTP_BACKOFF_FACTOR = float(os.environ.get("HTTP_BACKOFF_FACTOR", "0.5"))
+HTTP_POOL_HOSTS = int(os.environ.get("HTTP_POOL_HOSTS", "100"))  # number of per-host pools kept
+HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", "10"))  # keep-alive connections per host
+HTTP_MAX_BODY_BYTES = int(os.environ.get("HTTP_MAX_BODY_BYTES", str(2 * 1024 * 1024)))  # page prefix kept
+HTTP_CHUNK_BYTES = 64 * 1024
+
+# Page bodies of any other declared type (PDFs, images, video...) are not downloaded
+PAGE_CONTENT_TYPES = frozenset([
+    "text/html", "application/xhtml+xml", "text/plain", "text/xml", "application/xml",
+])
+CHARSET_PATTERN = re.compile(rb'charset=["\']?([\w-]+)', re.IGNORECASE)
+
+# Host health: after HOST_FAILURE_THRESHOLD connect failures or timeouts in a
+# row a host's remaining URLs are skipped for HOST_COOLDOWN seconds. Hosts
+# that have answered before get timeouts of HOST_TIMEOUT_FACTOR times their
+# usual response time, but never less than HTTP_MIN_TIMEOUT.
+HOST_FAILURE_THRESHOLD = int(os.environ.get("HOST_FAILURE_THRESHOLD", "2"))
+HOST_COOLDOWN = float(os.environ.get("HOST_COOLDOWN", "300"))
+HOST_TIMEOUT_FACTOR = float(os.environ.get("HOST_TIMEOUT_FACTOR", "4"))
+HTTP_MIN_TIMEOUT = float(os.environ.get("HTTP_MIN_TIMEOUT", "3"))
+
+# Addresses the crawler's connections resolve are cached per process. Names
+# that don't exist are cached for a shorter time; temporary failures
+# (EAI_AGAIN) are not cached at all
+DNS_CACHE_TTL = float(os.environ.get("DNS_CACHE_TTL", "300"))  # 0 turns the cache off
+DNS_NEGATIVE_TTL = float(os.environ.get("DNS_NEGATIVE_TTL", "60"))
+DNS_CACHE_MAX_ENTRIES = 10000
+DNS_NEGATIVE_ERRORS = frozenset(
+    getattr(socket, name) for name in ("EAI_NONAME", "EAI_NODATA") if hasattr(socket, name)
+)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+class HostUnavailable(requests.RequestException):
+    """Raised instead of contacting a host whose recent requests keep failing"""
+
+class HostHealth:
+    """Per-host circuit breaker and response time tracker, shared by all crawl threads"""
+
+    def __init__(self, failure_threshold=None, cooldown=None):
+        self.failure_threshold = failure_threshold or HOST_FAILURE_THRESHOLD
+        self.cooldown = HOST_COOLDOWN if cooldown is None else cooldown
+        self.counters = collections.Counter()
+        self.no_head = set()  # hosts that answer HEAD with 405/501
+        self._hosts = {}  # host -> [failures in a row, skipped until, average response time]
+        self._lock = threading.Lock()
+
+    def is_down(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            return state is not None and state[1] > time.monotonic()
+
+    def record_failure(self, host):
+        with self._lock:
+            state = self._hosts.setdefault(host, [0, 0.0, None])
+            state[0] += 1
+            # Past the cooldown a host gets one more try; failing it reopens the breaker
+            if state[0] >= self.failure_threshold:
+                state[1] = time.monotonic() + self.cooldown
+                self.counters["opened"] += 1
+                logger.warning(f"{host} failed {state[0]} times in a row, skipping it for {self.cooldown:.0f}s")
+
+    def record_success(self, host, seconds):
+        with self._lock:
+            state = self._hosts.setdefault(host, [0, 0.0, None])
+            state[0] = 0
+            state[2] = seconds if state[2] is None else 0.7 * state[2] + 0.3 * seconds
+
+    def timeout(self, host, default):
+        """(connect, read) timeouts for host: default, shortened for hosts known to answer quickly"""
+        with self._lock:
+            state = self._hosts.get(host)
+        if state is None or state[2] is None:
+            return default
+        limit = max(HTTP_MIN_TIMEOUT, HOST_TIMEOUT_FACTOR * state[2])
+        return tuple(min(value, limit) for value in default)
+
+    def supports_head(self, host):
+        with self._lock:
+            return host not in self.no_head
+
+    def record_no_head(self, host):
+        with self._lock:
+            self.no_head.add(host)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            down = sum(1 for state in self._hosts.values() if state[1] > now)
+            return dict(self.counters, down=down, no_head=len(self.no_head))
+
+class DnsCache:
+    """TTL cache in front of a getaddrinfo function; names that don't exist are cached for a shorter time"""
+
+    def __init__(self, resolve, ttl=None, negative_ttl=None):
+        self.resolve = resolve
+        self.ttl = ttl or DNS_CACHE_TTL
+        self.negative_ttl = DNS_NEGATIVE_TTL if negative_ttl is None else negative_ttl
+        self.counters = collections.Counter()
+        self._entries = {}  # lookup arguments -> (expires, addresses or gaierror args)
+        self._lock = threading.Lock()
+
+    def getaddrinfo(self, *args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            hit = entry is not None and entry[0] > now
+            self.counters["hits" if hit else "misses"] += 1
+        if hit:
+            if isinstance(entry[1], tuple):
+                raise socket.gaierror(*entry[1])
+            return entry[1]
+        
+        try:
+            addresses = self.resolve(*args, **kwargs)
+        except socket.gaierror as e:
+            if e.errno in DNS_NEGATIVE_ERRORS:
+                self._store(key, (now + self.negative_ttl, e.args))
+            raise
+        self._store(key, (now + self.ttl, addresses))
+        return addresses
+
+    def _store(self, key, entry):
+        with self._lock:
+            if len(self._entries) >= DNS_CACHE_MAX_ENTRIES:
+                now = time.monotonic()
+                self._entries = {key: value for key, value in self._entries.items() if value[0] > now}
+                if len(self._entries) >= DNS_CACHE_MAX_ENTRIES:
+                    self._entries.clear()
+            self._entries[key] = entry
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, entries=len(self._entries))
+
+_dns_cache = None
+_dns_cache_lock = threading.Lock()
+
+def get_dns_cache():
+    """Return the process-wide DNS cache, or None if DNS_CACHE_TTL is 0"""
+    global _dns_cache
+    if DNS_CACHE_TTL <= 0:
+        return None
+    with _dns_cache_lock:
+        if _dns_cache is None:
+            _dns_cache = DnsCache(socket.getaddrinfo)
+            metrics.register_collector("dns_cache", _dns_cache.stats)
+        return _dns_cache
+
+class _CachedDnsConnection:
+    """
+    urllib3 connection mixin that resolves its host through the DNS cache
+    and then connects to each address in turn, as urllib3 itself does.
+    socket.getaddrinfo is left alone for the rest of the process.
+    """
+
+    def _new_conn(self):
+        host = self._dns_host
+        dns_cache = get_dns_cache()
+        try:
+            ipaddress.ip_address(host.strip("[]"))
+            is_address = True
+        except ValueError:
+            is_address = False
+        if dns_cache is None or is_address:
+            return super()._new_conn()
+        
+        try:
+            addresses = dns_cache.getaddrinfo(host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise NewConnectionError(self, f"Failed to resolve '{host}' ({e})") from e
+        error = None
+        for address in addresses:
+            self._dns_host = address[4][0]
+            try:
+                return super()._new_conn()
+            except ConnectTimeoutError as e:  # NewConnectionError is a subclass
+                error = e
+            finally:
+                self._dns_host = host
+        raise error
+
+class _CachedDnsHTTPConnection(_CachedDnsConnection, HTTPConnection):
+    pass
+
+class _CachedDnsHTTPSConnection(_CachedDnsConnection, HTTPSConnection):
+    pass
+
+class _CachedDnsHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CachedDnsHTTPConnection
+
+class _CachedDnsHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CachedDnsHTTPSConnection
+
+class CachedDnsAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections look hosts up through the DNS cache"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CachedDnsHTTPConnectionPool,
+            "https": _CachedDnsHTTPSConnectionPool,
+        }
+
+def _url_host(url):
+    return urlparse(url).netloc.lower()
+
+class HttpClient:
+    """
+    Pooled HTTP client shared by the Places API calls and the crawler.
+    Connections are kept alive in per-host pools, and idempotent requests
+    are retried with exponential backoff on connection errors and 429/5xx.
+    """
+
+    def __init__(self, connect_timeout=None, read_timeout=None, max_retries=None, backoff_factor=None,
+                 pool_connections=None, pool_maxsize=None, page_cache=None, max_body_bytes=None):
+        self.page_cache = page_cache
+        self.max_body_bytes = max_body_bytes or HTTP_MAX_BODY_BYTES
+        self.counters = collections.Counter()
+        self._lock = threading.Lock()
+        self.hosts = HostHealth()
+        self.timeout = (
+            connect_timeout or HTTP_CONNECT_TIMEOUT,
+            read_timeout or HTTP_READ_TIMEOUT,
+        )
+        retry = Retry(
+            total=HTTP_MAX_RETRIES if max_retries is None else max_retries,
+            backoff_factor=HTTP_BACKOFF_FACTOR if backoff_factor is None else backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            raise_on_status=False,
+        )
+        adapter = CachedDnsAdapter(
+            pool_connections=pool_connections or HTTP_POOL_HOSTS,
+            pool_maxsize=pool_maxsize or HTTP_POOL_MAXSIZE,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url, **kwargs):
+        """GET a URL through the shared pools using the client's timeouts"""
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def read_body(self, response):
+        """
+        Stream a page body and decode at most max_body_bytes of it. Bodies
+        with a non-page Content-Type are not read at all. Returns "" for
+        those; skipped and truncated bytes are counted in self.counters.
+        """
+        content_length = int(response.headers.get("Content-Length", "0") or 0)
+        content_type = response.headers.get("Content-Type", "")
+        media_type = content_type.split(";", 1)[0].strip().lower()
+        if media_type and media_type not in PAGE_CONTENT_TYPES:
+            self._count(skipped_content_type=1, skipped_bytes=content_length)
+            return ""
+        
+        body = bytearray()
+        for chunk in response.iter_content(HTTP_CHUNK_BYTES):
+            body += chunk
+            if len(body) >= self.max_body_bytes:
+                # Without a Content-Length only the unread part of the last chunk is known
+                self._count(truncated=1, skipped_bytes=max(content_length, len(body)) - self.max_body_bytes)
+                del body[self.max_body_bytes:]
+                break
+        self._count(body_bytes=len(body))
+        
+        # Charset from the header, else from a <meta> tag near the top, else UTF-8
+        match = CHARSET_PATTERN.search(content_type.encode("latin-1")) or CHARSET_PATTERN.search(body, 0, 4096)
+        encoding = match.group(1).decode("ascii") if match else "utf-8"
+        try:
+            return body.decode(encoding, errors="replace")
+        except LookupError:
+            return body.decode("utf-8", errors="replace")
+
+    def _count(self, **values):
+        # read_body runs on many crawl threads at once
+        with self._lock:
+            self.counters.update(values)
+
+    def _check_host(self, host, url):
+        if self.hosts.is_down(host):
+            metrics.inc("http_errors_total", kind="host_down")
+            raise HostUnavailable(f"Skipped {url}: {host} keeps failing")
+
+    def _request(self, method, url, **kwargs):
+        """Send a crawler request, feeding its outcome to the host's health"""
+        host = _url_host(url)
+        self._check_host(host, url)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, timeout=self.hosts.timeout(host, self.timeout), **kwargs)
+        except requests.Timeout:
+            metrics.inc("http_errors_total", kind="timeout")
+            self.hosts.record_failure(host)
+            raise
+        except requests.ConnectionError:
+            metrics.inc("http_errors_total", kind="connection")
+            self.hosts.record_failure(host)
+            raise
+        self.hosts.record_success(host, time.perf_counter() - started)
+        return response
+
+    def fetch_body(self, url, headers=None):
+        """GET a web page, streaming its body through read_body. Returns (response, text)"""
+        with metrics.timer("http_fetch"):
+            response = self._request("GET", url, headers=headers, stream=True)
+            with response:
+                metrics.inc("http_responses_total", status=response.status_code)
+                # Error bodies are read too (they are small) so the connection can be reused
+                return response, self.read_body(response)
+
+    def probe(self, url):
+        """
+        HEAD a URL, following redirects, to learn whether it is worth a GET.
+        Returns (status_code, final URL), or None for hosts that don't
+        support HEAD. Missing pages are stored in the page cache like a GET's.
+        """
+        host = _url_host(url)
+        self._check_host(host, url)
+        if not self.hosts.supports_head(host):
+            return None
+        with metrics.timer("http_probe"):
+            response = self._request("HEAD", url, allow_redirects=True)
+            response.close()
+        metrics.inc("http_probes_total", status=response.status_code)
+        if response.status_code in (405, 501):
+            self.hosts.record_no_head(host)
+            return None
+        if response.status_code in (404, 410) and self.page_cache is not None:
+            self.page_cache.store(PageResponse(url, response.status_code, "", False))
+        return response.status_code, response.url
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def lookup_page(self, url):
+        """Return a fresh cached copy of a web page, or None"""
+        if self.page_cache is None:
+            return None
+        return self.page_cache.lookup(url)
+
+    def get_page(self, url):
+        """
+        GET a web page through the page cache. Fresh entries are served from
+        the cache, stale ones are revalidated with their ETag/Last-Modified,
+        and 404s and timeouts are remembered for a shorter time.
+        """
+        if self.page_cache is None:
+            response, text = self.fetch_body(url)
+            return PageResponse(url, response.status_code, text, False)
+        
+        cached = self.page_cache.lookup(url)
+        if cached is not None:
+            return cached
+        
+        self.page_cache.record_miss()
+        entry = self.page_cache.stale_entry(url)
+        headers = {}
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        
+        try:
+            response, text = self.fetch_body(url, headers=headers)
+        except (requests.Timeout, requests.ConnectionError):
+            self.page_cache.store_failure(url)
+            raise
+        
+        if response.status_code == 304 and entry is not None:
+            return self.page_cache.refresh(url)
+        
+        page = PageResponse(url, response.status_code, text, False)
+        self.page_cache.store(page, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return page
+
+    def close(self):
+        self.session.close()
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+def get_http_client():
+    """Return the process-wide HTTP client, creating it on first use"""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = HttpClient(page_cache=get_page_cache())
+            metrics.register_collector("http_body", _http_client.stats)
+            metrics.register_collector("hosts", _http_client.hosts.stats)
+        return _http_client
+
+# Page Cache
+# Crawled pages are cached on disk so overlapping searches do not download the
+# same homepages and contact pages again
+PAGE_CACHE_ENABLED = os.environ.get("PAGE_CACHE_ENABLED", "1") == "1"
+PAGE_CACHE_PATH = os.environ.get("PAGE_CACHE_PATH", os.path.join(".scout_cache", "pages.sqlite3"))
+PAGE_CACHE_TTL = float(os.environ.get("PAGE_CACHE_TTL", str(24 * 3600)))
+PAGE_CACHE_NEGATIVE_TTL = float(os.environ.get("PAGE_CACHE_NEGATIVE_TTL", str(6 * 3600)))  # 404/410
+PAGE_CACHE_FAILURE_TTL = float(os.environ.get("PAGE_CACHE_FAILURE_TTL", str(30 * 60)))  # timeouts, refused
+PAGE_CACHE_MAX_BYTES = int(os.environ.get("PAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# A fetched (or cached) page; status_code 0 marks a cached connection failure
+PageResponse = collections.namedtuple("PageResponse", ["url", "status_code", "text", "from_cache"])
+
+def normalize_url(url):
+    """Normalize a URL for use as a cache or dedup key"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme, netloc.rsplit(':', 1)[-1]) in (("http", "80"), ("https", "443")):
+        netloc = netloc.rsplit(':', 1)[0]
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, parts.path or '/', query, ''))
+
+class PageCache:
+    """
+    SQLite-backed cache of crawled pages keyed by normalized URL. Entries
+    expire after a TTL and are revalidated rather than refetched when the
+    server sent validators. 404/410 responses and connection failures are
+    cached negatively. The least recently used pages are evicted once the
+    stored bodies exceed max_bytes.
+    """
+
+    def __init__(self, path=None, ttl=None, negative_ttl=None, failure_ttl=None, max_bytes=None):
+        self.path = path or PAGE_CACHE_PATH
+        self.ttl = PAGE_CACHE_TTL if ttl is None else ttl
+        self.negative_ttl = PAGE_CACHE_NEGATIVE_TTL if negative_ttl is None else negative_ttl
+        self.failure_ttl = PAGE_CACHE_FAILURE_TTL if failure_ttl is None else failure_ttl
+        self.max_bytes = max_bytes or PAGE_CACHE_MAX_BYTES
+        self.counters = collections.Counter()
+        self._lock = threading.Lock()
+        
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                body TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)")
+        self._db.commit()
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def _row(self, url):
+        return self._db.execute(
+            "SELECT status, body, etag, last_modified, expires_at FROM pages WHERE url = ?",
+            (normalize_url(url),),
+        ).fetchone()
+
+    def lookup(self, url):
+        """Return the cached page if it is still fresh"""
+        now = time.time()
+        with metrics.timer("page_cache"), self._lock:
+            row = self._row(url)
+            if row is None or row[4] <= now:
+                return None
+            self._db.execute("UPDATE pages SET last_access = ? WHERE url = ?", (now, normalize_url(url)))
+            self._db.commit()
+            self.counters["hits"] += 1
+            if row[0] != 200:
+                self.counters["negative_hits"] += 1
+        return PageResponse(url, row[0], row[1], True)
+
+    def record_miss(self):
+        """Count a page that had to be fetched from the network"""
+        with self._lock:
+            self.counters["misses"] += 1
+
+    def stale_entry(self, url):
+        """Return the validators of an expired successful entry, if any"""
+        with self._lock:
+            row = self._row(url)
+        if row is None or row[0] != 200 or not (row[2] or row[3]):
+            return None
+        return {"etag": row[2], "last_modified": row[3]}
+
+    def refresh(self, url):
+        """Extend an entry the server confirmed as unchanged (304) and return it"""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE pages SET expires_at = ?, last_access = ? WHERE url = ?",
+                (now + self.ttl, now, normalize_url(url)),
+            )
+            self._db.commit()
+            row = self._row(url)
+            self.counters["revalidated"] += 1
+        return PageResponse(url, row[0], row[1], True)
+
+    def store(self, page, etag=None, last_modified=None):
+        """Cache a fetched page; only 200s and 404/410s are kept"""
+        if page.status_code == 200:
+            ttl = self.ttl
+        elif page.status_code in (404, 410):
+            ttl = self.negative_ttl
+        else:
+            return
+        body = page.text if page.status_code == 200 else ""
+        self._put(page.url, page.status_code, body, etag, last_modified, ttl)
+
+    def store_failure(self, url):
+        """Remember that a URL timed out or refused the connection"""
+        self._put(url, 0, "", None, None, self.failure_ttl)
+
+    def _put(self, url, status, body, etag, last_modified, ttl):
+        now = time.time()
+        size = len(body)
+        key = normalize_url(url)
+        with metrics.timer("page_cache"), self._lock:
+            previous = self._db.execute("SELECT size FROM pages WHERE url = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, status, body, etag, last_modified, now, now + ttl, now, size),
+            )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._db.commit()
+            self.counters["stores"] += 1
+
+    def _evict(self):
+        # Drop least recently used pages until the cache is back under 90% of its budget
+        target = self.max_bytes * 0.9
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        rows = self._db.execute("SELECT url, size FROM pages ORDER BY last_access")
+        evicted = []
+        for url, size in rows:
+            if self._total_bytes <= target:
+                break
+            evicted.append((url,))
+            self._total_bytes -= size
+        self._db.executemany("DELETE FROM pages WHERE url = ?", evicted)
+        self.counters["evictions"] += len(evicted)
+
+    def stats(self):
+        """Hit/miss counters plus the current size of the cache; a miss is a network fetch"""
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            return dict(self.counters, entries=entries, bytes=self._total_bytes)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM pages")
+            self._db.commit()
+            self._total_bytes = 0
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+def get_page_cache():
+    """Return the process-wide page cache, or None when caching is disabled"""
+    global _page_cache
+    if not PAGE_CACHE_ENABLED:
+        return None
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = PageCache()
+            metrics.register_collector("page_cache", _page_cache.stats)
+        return _page_cache
+
+# HTML parser backend: lxml builds the tree several times faster than the
+# pure-Python parser, so it is used whenever it is installed. Only looked up
+# here; BeautifulSoup and lxml are imported by the first page parse.
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+# API Response Cache
+# Paid API responses (Places searches and details) are kept in a small
+# key/value store with per-entry TTLs
+API_CACHE_ENABLED = os.environ.get("API_CACHE_ENABLED", "1") == "1"
+API_CACHE_PATH = os.environ.get("API_CACHE_PATH", os.path.join(".scout_cache", "api.sqlite3"))
+# Expired entries are purged when the cache is opened and then every this many writes
+API_CACHE_PURGE_EVERY = int(os.environ.get("API_CACHE_PURGE_EVERY", "1000"))
+
+class ApiCache:
+    """SQLite-backed JSON key/value cache with a TTL per entry"""
+
+    def __init__(self, path=None):
+        self.path = path or API_CACHE_PATH
+        self.counters = collections.Counter()
+        self._lock = threading.Lock()
+        
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_expires_at ON responses (expires_at)")
+        self._writes = 0
+        self._purge_expired()
+        self._db.commit()
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM responses WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+            self.counters["hits" if row is not None else "misses"] += 1
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, json.dumps(value), now + ttl)
+            )
+            self._writes += 1
+            if self._writes % API_CACHE_PURGE_EVERY == 0:
+                self._purge_expired()
+            self._db.commit()
+
+    def _purge_expired(self):
+        # Expired rows are never returned, so they only need clearing out now and then
+        self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+_api_cache = None
+_api_cache_lock = threading.Lock()
+
+def get_api_cache():
+    """Return the process-wide API cache, or None when caching is disabled"""
+    global _api_cache
+    if not API_CACHE_ENABLED:
+        return None
+    with _api_cache_lock:
+        if _api_cache is None:
+            _api_cache = ApiCache()
+            metrics.register_collector("api_cache", _api_cache.stats)
+        return _api_cache
+
+# Lead Store
+# Every enriched business is kept by place_id, and every crawled website by
+# domain, so later searches and bulk runs only re-crawl what is older than
+# LEAD_STALE_AFTER
+LEAD_STORE_ENABLED = os.environ.get("LEAD_STORE_ENABLED", "1") == "1"
+LEAD_STORE_PATH = os.environ.get("LEAD_STORE_PATH", os.path.join(".scout_cache", "leads.sqlite3"))
+LEAD_STALE_AFTER = float(os.environ.get("LEAD_STALE_AFTER", str(30 * 24 * 3600)))
+
+class LeadStore:
+    """
+    SQLite store of enriched businesses, indexed by domain, email and
+    crawl time, plus the emails found per crawled domain
+    """
+
+    def __init__(self, path=None):
+        self.path = path or LEAD_STORE_PATH
+        self.counters = collections.Counter()
+        self._lock = threading.Lock()
+        
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS leads (
+                place_id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                address TEXT NOT NULL,
+                types TEXT NOT NULL,
+                website TEXT NOT NULL,
+                phone TEXT NOT NULL,
+                domain TEXT,
+                emails TEXT NOT NULL,
+                first_seen_at REAL NOT NULL,
+                crawled_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS leads_domain ON leads (domain, crawled_at);
+            CREATE INDEX IF NOT EXISTS leads_crawled_at ON leads (crawled_at);
+            CREATE TABLE IF NOT EXISTS lead_emails (
+                email TEXT NOT NULL,
+                place_id TEXT NOT NULL,
+                PRIMARY KEY (email, place_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS lead_emails_place_id ON lead_emails (place_id);
+            CREATE TABLE IF NOT EXISTS domains (
+                domain TEXT PRIMARY KEY,
+                emails TEXT NOT NULL,
+                crawled_at REAL NOT NULL
+            );
+        """)
+        self._db.commit()
+
+    def get(self, place_id, max_age=None):
+        """Return the stored lead for place_id, or None if missing or crawled more than max_age seconds ago"""
+        oldest = time.time() - max_age if max_age is not None else 0
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM leads WHERE place_id = ? AND crawled_at >= ?", (place_id, oldest)
+            ).fetchone()
+            self.counters["hits" if row is not None else "misses"] += 1
+        return _lead_from_row(row) if row is not None else None
+
+    def save(self, business, crawled_at=None):
+        """
+        Insert or update a business, keeping when it was first seen.
+        crawled_at is when its emails were crawled (default now).
+        """
+        now = time.time()
+        crawled_at = crawled_at or now
+        website = business.get("website", "")
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO leads VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (place_id) DO UPDATE SET name = excluded.name, address = excluded.address, "
+                "types = excluded.types, website = excluded.website, phone = excluded.phone, "
+                "domain = excluded.domain, emails = excluded.emails, crawled_at = excluded.crawled_at",
+                (
+                    business["place_id"], business.get("name", ""), business.get("address", ""),
+                    json.dumps(business.get("types", [])), website, business.get("phone", ""),
+                    site_domain(website) if website else None, json.dumps(business.get("email", [])),
+                    now, crawled_at,
+                )
+            )
+            self._db.execute("DELETE FROM lead_emails WHERE place_id = ?", (business["place_id"],))
+            self._db.executemany(
+                "INSERT OR IGNORE INTO lead_emails VALUES (?, ?)",
+                [(email.lower(), business["place_id"]) for email in business.get("email", [])]
+            )
+            self._db.commit()
+            self.counters["saves"] += 1
+
+    def domain_emails(self, domain, max_age=None):
+        """
+        Return (emails, crawled_at) from when domain was last crawled, or
+        None if never or too long ago
+        """
+        oldest = time.time() - max_age if max_age is not None else 0
+        with self._lock:
+            row = self._db.execute(
+                "SELECT emails, crawled_at FROM domains WHERE domain = ? AND crawled_at >= ?", (domain, oldest)
+            ).fetchone()
+            self.counters["domain_hits" if row is not None else "domain_misses"] += 1
+        return (json.loads(row[0]), row[1]) if row is not None else None
+
+    def save_domain(self, domain, emails, crawled_at=None):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO domains VALUES (?, ?, ?)",
+                (domain, json.dumps(list(emails)), crawled_at or time.time())
+            )
+            self._db.commit()
+
+    def query(self, domain=None, email=None, crawled_after=None, crawled_before=None, with_email=None,
+              limit=100, offset=0):
+        """
+        Return stored leads matching every given filter, most recently
+        crawled first. domain is a website's host without "www." (see site_domain);
+        email matches case-insensitively.
+        """
+        conditions = []
+        params = []
+        if domain is not None:
+            conditions.append("domain = ?")
+            params.append(domain)
+        if email is not None:
+            conditions.append("place_id IN (SELECT place_id FROM lead_emails WHERE email = ?)")
+            params.append(email.lower())
+        if crawled_after is not None:
+            conditions.append("crawled_at >= ?")
+            params.append(crawled_after)
+        if crawled_before is not None:
+            conditions.append("crawled_at < ?")
+            params.append(crawled_before)
+        if with_email is not None:
+            conditions.append("emails != '[]'" if with_email else "emails = '[]'")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT * FROM leads {where} ORDER BY crawled_at DESC LIMIT ? OFFSET ?", (*params, limit, offset)
+            ).fetchall()
+        return [_lead_from_row(row) for row in rows]
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+def _lead_from_row(row):
+    """A stored lead as a business dict, plus domain, first_seen_at and crawled_at"""
+    return {
+        "name": row["name"],
+        "address": row["address"],
+        "place_id": row["place_id"],
+        "types": json.loads(row["types"]),
+        "website": row["website"],
+        "phone": row["phone"],
+        "email": json.loads(row["emails"]),
+        "domain": row["domain"],
+        "first_seen_at": row["first_seen_at"],
+        "crawled_at": row["crawled_at"],
+    }
+
+_lead_store = None
+_lead_store_lock = threading.Lock()
+
+def get_lead_store():
+    """Return the process-wide lead store, or None when it is disabled"""
+    global _lead_store
+    if not LEAD_STORE_ENABLED:
+        return None
+    with _lead_store_lock:
+        if _lead_store is None:
+            _lead_store = LeadStore()
+            metrics.register_collector("lead_store", _lead_store.stats)
+        return _lead_store
+
+# Email Extraction and Validation Functions
+# All patterns are compiled once at import; extraction runs on every fetched page
+EMAIL_PATTERN = re.compile(r'[\w\.-]+@[\w\.-]+\.\w+', re.IGNORECASE)
+EMAIL_RUN_PATTERN = re.compile(r'[\w.@-]*')
+MAILTO_PATTERN = re.compile(r'mailto:([\w\.-]+@[\w\.-]+\.\w+)')
+SCRIPT_EMAIL_PATTERN = re.compile(r'[\'"]([\w\.-]+)[\'"][\s]*\+[\s]*[\'"]@[\'"][\s]*\+[\s]*[\'"]([\w\.-]+\.\w+)[\'"]')
+
+# KaTeX-rendered "at" and "dot". These stay regexes (their "." is a wildcard) so
+# they match exactly what the old replacement chain did
+KATEX_DISPLAY_AT = r'<span class="katex-display"><span class="katex"><span class="katex-mathml"><math xmlns="http://www.w3.org/1998/Math/MathML" display="block"><semantics><mrow><mi>a</mi><mi>t</mi></mrow><annotation encoding="application/x-tex">at</annotation></semantics></math></span><span class="katex-html" aria-hidden="true"><span class="base"><span class="strut" style="height:0.6151em;"></span><span class="mord mathnormal">a</span><span class="mord mathnormal">t</span></span></span></span></span>'
+KATEX_DISPLAY_DOT = r'<span class="katex-display"><span class="katex"><span class="katex-mathml"><math xmlns="http://www.w3.org/1998/Math/MathML" display="block"><semantics><mrow><mi>d</mi><mi>o</mi><mi>t</mi></mrow><annotation encoding="application/x-tex">dot</annotation></semantics></math></span><span class="katex-html" aria-hidden="true"><span class="base"><span class="strut" style="height:0.6944em;"></span><span class="mord mathnormal">d</span><span class="mord mathnormal">o</span><span class="mord mathnormal">t</span></span></span></span></span>'
+KATEX_AT = r'<span class="katex"><span class="katex-mathml"><math xmlns="http://www.w3.org/1998/Math/MathML"><semantics><mrow><mi>a</mi><mi>t</mi></mrow><annotation encoding="application/x-tex">at</annotation></semantics></math></span><span class="katex-html" aria-hidden="true"><span class="base"><span class="strut" style="height:0.6151em;"></span><span class="mord mathnormal">a</span><span class="mord mathnormal">t</span></span></span></span>'
+KATEX_DOT = r'<span class="katex"><span class="katex-mathml"><math xmlns="http://www.w3.org/1998/Math/MathML"><semantics><mrow><mi>d</mi><mi>o</mi><mi>t</mi></mrow><annotation encoding="application/x-tex">dot</annotation></semantics></math></span><span class="katex-html" aria-hidden="true"><span class="base"><span class="strut" style="height:0.6944em;"></span><span class="mord mathnormal">d</span><span class="mord mathnormal">o</span><span class="mord mathnormal">t</span></span></span></span>'
+
+# " at " / " dot " and KaTeX obfuscations, normalized in one pass. The "dot"
+# branch consumes its trailing whitespace atomically and yields when an " at "
+# follows, which reproduces replacing every "at" form before any "dot" form.
+# Every branch starts with whitespace or '<', so the pattern opens with that
+# character class: the regex engine then only tries positions holding one of
+# those characters and skips the rest of the page in C.
+OBFUSCATION_PATTERN = re.compile(
+    r'[\s<](?:'
+    r'(?<=\s)(?P<at>\s*at\s+)'
+    r'|(?<=\s)(?P<dot>\s*dot(?=(?P<dot_space>\s+))(?P=dot_space)(?!at\s))'
+    r'|(?<=<)(?P<katex_display_at>' + KATEX_DISPLAY_AT[1:] + r')'
+    r'|(?<=<)(?P<katex_display_dot>' + KATEX_DISPLAY_DOT[1:] + r')'
+    r'|(?<=<)(?P<katex_at>' + KATEX_AT[1:] + r')'
+    r'|(?<=<)(?P<katex_dot>' + KATEX_DOT[1:] + r')'
+    r')',
+    re.IGNORECASE,
+)
+OBFUSCATION_REPLACEMENTS = {
+    'at': '@',
+    'dot': '.',
+    'katex_display_at': '@',
+    'katex_display_dot': '.',
+    'katex_at': '@',
+    'katex_dot': '.',
+}
+
+# Validation verdicts are cached per address; the same emails turn up on many
+# pages of a site and again in the LLM stage
+EMAIL_VERDICT_CACHE_SIZE = int(os.environ.get("EMAIL_VERDICT_CACHE_SIZE", "100000"))
+DISPOSABLE_DOMAINS_FILE = os.environ.get("DISPOSABLE_DOMAINS_FILE", "")
+
+BASIC_EMAIL_PATTERN = re.compile(r"[^@]+@[^@]+\.[^@]+")
+# Filter out certain patterns that might be invalid
+INVALID_EMAIL_PATTERN = re.compile(
+    r'example\.com$'   # Example domains
+    r'|test.*@'         # Test emails
+    r'|noreply@'        # No-reply addresses
+    r'|donotreply@',    # Do not reply addresses
+    re.IGNORECASE,
+)
+
+# Disposable email domains (simplified built-in list, extended from a file)
+BUILTIN_DISPOSABLE_DOMAINS = frozenset(['mailinator.com', 'tempmail.com', 'fakeinbox.com', 'temp-mail.org'])
+DISPOSABLE_DOMAINS = BUILTIN_DISPOSABLE_DOMAINS
+
+def load_disposable_domains(path):
+    """
+    Load a disposable domain list (one domain per line, '#' comments allowed)
+    on top of the built-in list, and reset the cached verdicts
+    """
+    global DISPOSABLE_DOMAINS
+    domains = set(BUILTIN_DISPOSABLE_DOMAINS)
+    with open(path, encoding="utf-8") as domain_file:
+        for line in domain_file:
+            domain = line.split('#', 1)[0].strip().lower()
+            if domain:
+                domains.add(domain)
+    DISPOSABLE_DOMAINS = frozenset(domains)
+    is_valid_email.cache_clear()
+    logger.info(f"Loaded {len(DISPOSABLE_DOMAINS)} disposable email domains from {path}")
+    return DISPOSABLE_DOMAINS
+
+@functools.lru_cache(maxsize=EMAIL_VERDICT_CACHE_SIZE)
+def is_valid_email(email):
+    """Enhanced email validation using email-validator library"""
+    try:
+        # Basic format validation
+        if not BASIC_EMAIL_PATTERN.match(email):
+            return False
+        
+        # More thorough validation with email_validator
+        import email_validator
+        email_validator.validate_email(email, check_deliverability=False)
+        
+        # Additional checks
+        domain = email.split('@')[1]
+        
+        # Check against disposable email domains
+        if domain.lower() in DISPOSABLE_DOMAINS:
+            logger.info(f"Filtered out disposable email: {email}")
+            return False
+        
+        if INVALID_EMAIL_PATTERN.search(email):
+            logger.info(f"Filtered out invalid pattern in email: {email}")
+            return False
+                
+        return True
+    except Exception as e:
+        logger.warning(f"Email validation error for {email}: {str(e)}")
+        return False
+
+if DISPOSABLE_DOMAINS_FILE:
+    load_disposable_domains(DISPOSABLE_DOMAINS_FILE)
+
+def unique_valid_emails(emails, known_valid=()):
+    """
+    Ordered-set dedup plus validation: each distinct address is checked once,
+    and addresses in known_valid are kept without being checked again
+    """
+    with metrics.timer("email_validation"):
+        unique_emails = dict.fromkeys(known_valid)
+        for email in emails:
+            if email not in unique_emails and is_valid_email(email):
+                unique_emails[email] = None
+        return list(unique_emails)
+
+def _find_email_matches(text):
+    """
+    Yield standard-pattern matches, scanning only the run of email characters
+    around each '@' instead of the whole text. A match can never cross a
+    character outside [\\w.@-], so this gives exactly what findall would.
+    """
+    at = text.find('@')
+    if at == -1:
+        return
+    
+    # The run's start is found by matching forward over the reversed text
+    reversed_text = text[::-1]
+    size = len(text)
+    while at != -1:
+        start = size - EMAIL_RUN_PATTERN.match(reversed_text, size - at).end()
+        end = EMAIL_RUN_PATTERN.match(text, at).end()
+        yield from EMAIL_PATTERN.findall(text, start, end)
+        at = text.find('@', end)
+
+def _deobfuscate(match):
+    return OBFUSCATION_REPLACEMENTS[match.lastgroup]
+
+def extract_emails_from_text(text):
+    """
+    Enhanced function to extract emails from text using various regex patterns
+    to account for different email formats and obfuscation techniques
+    """
+    if not text:
+        return []
+    
+    with metrics.timer("regex_extraction"):
+        # Extract emails using standard pattern
+        emails = list(_find_email_matches(text))
+        
+        # Emails with common obfuscation (e.g., "email at domain dot com")
+        text_with_replacements, replaced = OBFUSCATION_PATTERN.subn(_deobfuscate, text)
+        if replaced:
+            emails.extend(_find_email_matches(text_with_replacements))
+        
+        # Combine and filter for unique valid emails
+        return unique_valid_emails(emails)
+
+# Links that never lead to a crawlable page
+NON_PAGE_LINK_PREFIXES = ('mailto:', 'tel:', 'javascript:', '#')
+
+def _resolve_contact_link(href, base_url):
+    """Resolve a link found on base_url, or return None if it leaves the site"""
+    clean_base = base_url.split('://')[-1]
+    if href.startswith(NON_PAGE_LINK_PREFIXES):
+        return None
+    if href.startswith('/'):
+        contact_link = base_url.rstrip('/') + href
+    elif href.startswith('http'):
+        if clean_base not in href:  # Only if it's the same domain
+            return None
+        contact_link = href
+    else:
+        contact_link = base_url.rstrip('/') + '/' + href
+    
+    path = contact_link.replace(base_url, '').lstrip('/')
+    return path if path.startswith('http') else base_url + path
+
+def analyze_page(html_content, base_url=None):
+    """
+    Parse an HTML page once and collect everything the crawler needs from it:
+    emails found in the text, mailto links, data-email attributes and
+    script-assembled addresses, plus candidate contact page links when
+    base_url is given. "emails" holds the unique valid addresses in that order.
+    """
+    with metrics.timer("html_parse"):
+        analysis = _analyze_page(html_content, base_url)
+    metrics.inc("pages_analyzed_total")
+    metrics.inc("page_emails_total", len(analysis["emails"]))
+    return analysis
+
+def _analyze_page(html_content, base_url):
+    analysis = {
+        "emails": [],
+        "text_emails": [],
+        "mailto_emails": [],
+        "data_emails": [],
+        "script_emails": [],
+        "contact_links": [],
+    }
+    if not html_content:
+        return analysis
+    
+    # Extract standard emails from text
+    analysis["text_emails"] = extract_emails_from_text(html_content)
+    
+    # Walk the parsed tree once for links, data attributes and scripts
+    try:
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html_content, HTML_PARSER)
+        
+        for element in soup.find_all(True):
+            # Extract from data-email attributes (common in protected emails)
+            email = element.get('data-email')
+            if email and '@' in email and '.' in email:
+                analysis["data_emails"].append(email)
+            
+            if element.name == 'a':
+                href = element.get('href')
+                if href is None:
+                    continue
+                
+                # Extract from mailto links
+                if href.startswith('mailto:'):
+                    email_match = MAILTO_PATTERN.search(href)
+                    if email_match:
+                        analysis["mailto_emails"].append(email_match.group(1))
+                
+                # Look for links containing "contact" or similar terms
+                if base_url:
+                    link_text = element.text.lower()
+                    if any(term in link_text for term in ['contact', 'email', 'reach', 'connect']):
+                        contact_url = _resolve_contact_link(href.lower(), base_url)
+                        if contact_url and contact_url not in analysis["contact_links"]:
+                            analysis["contact_links"].append(contact_url)
+            
+            # Look for obfuscated emails in scripts (common technique)
+            elif element.name == 'script':
+                script_text = element.string if element.string else ""
+                if script_text and ('email' in script_text.lower() or '@' in script_text):
+                    # Look for patterns like var email = 'user' + '@' + 'domain.com';
+                    email_parts = SCRIPT_EMAIL_PATTERN.findall(script_text)
+                    for parts in email_parts:
+                        if len(parts) == 2:
+                            analysis["script_emails"].append(f"{parts[0]}@{parts[1]}")
+    except Exception as e:
+        logger.error(f"HTML parsing error: {str(e)}")
+    
+    # Filter for unique valid emails; text emails are already validated
+    analysis["emails"] = unique_valid_emails(
+        analysis["mailto_emails"] + analysis["data_emails"] + analysis["script_emails"],
+        known_valid=analysis["text_emails"],
+    )
+    
+    return analysis
+
+def extract_emails_from_html(html_content):
+    """Extract emails from HTML content, including mailto links and data attributes"""
+    return analyze_page(html_content)["emails"]
+
+# Parse Workers
+# Parsing and extraction are CPU-bound and hold the GIL, so with PARSE_WORKERS
+# set (to the core count on crawl boxes) page bodies are analyzed in a pool of
+# worker processes while the crawl threads keep fetching. Pages go over in
+# batches to keep the IPC overhead small, and a bounded backlog makes fetching
+# wait when the workers fall behind. 0 analyzes pages on the crawl threads.
+PARSE_WORKERS = int(os.environ.get("PARSE_WORKERS", "0"))
+PARSE_BATCH_SIZE = int(os.environ.get("PARSE_BATCH_SIZE", "8"))
+PARSE_BATCH_WAIT = float(os.environ.get("PARSE_BATCH_WAIT", "0.01"))  # seconds a partial batch waits for more pages
+PARSE_MAX_PENDING = int(os.environ.get("PARSE_MAX_PENDING", "0"))  # pages queued or in the pool; 0 = 4 batches per worker
+
+def analyze_pages(pages):
+    """
+    Analyze a batch of (html_content, base_url) pages in a parse worker.
+    Returns the analyses (None for a page that failed) and the worker's
+    metrics for the batch, which the parent merges into its own.
+    """
+    analyses = []
+    for html_content, base_url in pages:
+        try:
+            analyses.append(analyze_page(html_content, base_url))
+        except Exception as e:
+            logger.error(f"Error analyzing page from {base_url}: {str(e)}")
+            analyses.append(None)
+    return analyses, metrics.drain()
+
+def create_parse_pool(workers):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # forkserver rather than fork: crawl processes run threads, and a forked
+    # child could inherit a lock some other thread was holding
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver"))
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+def get_parse_pool():
+    """Return the process-wide parse worker pool, or None to parse on the crawl threads"""
+    global _parse_pool
+    if PARSE_WORKERS <= 0:
+        return None
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = create_parse_pool(PARSE_WORKERS)
+        return _parse_pool
+
+class PageParser:
+    """Collects pages from one event loop into batches for a parse worker pool"""
+
+    def __init__(self, pool, workers=None, batch_size=None, batch_wait=None, max_pending=None):
+        self.pool = pool
+        self.batch_size = batch_size or PARSE_BATCH_SIZE
+        self.batch_wait = PARSE_BATCH_WAIT if batch_wait is None else batch_wait
+        max_pending = max_pending or PARSE_MAX_PENDING or 4 * self.batch_size * (workers or PARSE_WORKERS or 1)
+        self._slots = asyncio.Semaphore(max_pending)
+        self._batch = []
+        self._flush_timer = None
+
+    async def analyze(self, html_content, base_url=None):
+        """analyze_page() in a worker process; None if the page could not be analyzed"""
+        # Backpressure: a full backlog holds up the crawl that fetched this page
+        async with self._slots:
+            future = asyncio.get_running_loop().create_future()
+            self._batch.append((html_content, base_url, future))
+            if len(self._batch) >= self.batch_size:
+                self._flush()
+            elif self._flush_timer is None:
+                self._flush_timer = asyncio.get_running_loop().call_later(self.batch_wait, self._flush)
+            return await future
+
+    def _flush(self):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        batch, self._batch = self._batch, []
+        futures = [future for _, _, future in batch]
+        done = asyncio.get_running_loop().run_in_executor(
+            self.pool, analyze_pages, [(html_content, base_url) for html_content, base_url, _ in batch]
+        )
+        done.add_done_callback(functools.partial(self._deliver, futures))
+        metrics.inc("parse_batches_total")
+
+    def _deliver(self, futures, done):
+        error = asyncio.CancelledError() if done.cancelled() else done.exception()
+        if error is not None:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        analyses, worker_metrics = done.result()
+        metrics.merge(worker_metrics)
+        for future, analysis in zip(futures, analyses):
+            # A future is already done if the crawl waiting on it was cancelled
+            if not future.done():
+                future.set_result(analysis)
+
+# Crawl Engine
+# Politeness and concurrency knobs for the contact page crawler
+CRAWL_GLOBAL_CONCURRENCY = int(os.environ.get("CRAWL_GLOBAL_CONCURRENCY", "20"))
+CRAWL_PER_HOST_CONCURRENCY = int(os.environ.get("CRAWL_PER_HOST_CONCURRENCY", "3"))
+CRAWL_HOST_RATE = float(os.environ.get("CRAWL_HOST_RATE", "2.0"))  # requests per second per host
+CRAWL_HOST_BURST = int(os.environ.get("CRAWL_HOST_BURST", "3"))
+
+# A site crawl stops once it has found this many emails or sent this many
+# requests (HEADs and GETs, homepage and sitemap included)
+CRAWL_EMAIL_BUDGET = int(os.environ.get("CRAWL_EMAIL_BUDGET", "1"))
+CRAWL_PAGE_BUDGET = int(os.environ.get("CRAWL_PAGE_BUDGET", "8"))
+
+# Common contact page paths
+CONTACT_PATHS = [
+    'contact', 'contact-us', 'contacts', 'about', 'about-us', 'get-in-touch',
+    'reach-us', 'connect', 'support', 'help', 'info', 'team', 'our-team', 
+    'people', 'staff', 'directory', 'meet-the-team', 'meet-our-team',
+    'company/team', 'company/contact', 'company/about',
+    'about/contact', 'about/team', 'en/contact', 'en/about',
+]
+
+# Sitemap entries whose path contains one of these are queued, best match first
+SITEMAP_KEYWORDS = ['contact', 'team', 'staff', 'people', 'about', 'reach', 'connect', 'support']
+SITEMAP_MAX_URLS = int(os.environ.get("SITEMAP_MAX_URLS", "5"))
+SITEMAP_LOC_PATTERN = re.compile(r'<loc>\s*([^<\s]+)\s*</loc>', re.IGNORECASE)
+
+# Frontier priorities: links found on the homepage, then matching sitemap
+# entries, then the guessed CONTACT_PATHS
+FRONTIER_DISCOVERED = 0
+FRONTIER_SITEMAP = 1
+FRONTIER_GUESSED = 2
+
+def site_base_url(url):
+    """Normalize a website URL to the base used for resolving contact paths"""
+    return url if url.endswith('/') else url + '/'
+
+def _site_host(url):
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+# Social networks, site builders, directories and other platforms that host
+# many unrelated businesses, each under its own subdomain or path. Their
+# crawl results are never shared between businesses.
+SHARED_HOSTING_DOMAINS = frozenset([
+    'facebook.com', 'fb.com', 'instagram.com', 'twitter.com', 'x.com', 'linkedin.com', 'youtube.com',
+    'tiktok.com', 'pinterest.com', 'nextdoor.com', 'linktr.ee', 'google.com', 'goo.gl', 'business.site',
+    'wixsite.com', 'wix.com', 'squarespace.com', 'weebly.com', 'wordpress.com', 'blogspot.com', 'github.io',
+    'godaddysites.com', 'square.site', 'webflow.io', 'netlify.app', 'vercel.app', 'herokuapp.com',
+    'myshopify.com', 'carrd.co', 'jimdosite.com', 'strikingly.com', 'site123.me', 'ueniweb.com',
+    'yelp.com', 'tripadvisor.com', 'yellowpages.com', 'doordash.com', 'ubereats.com', 'grubhub.com',
+    'opentable.com', 'toasttab.com', 'vagaro.com', 'booksy.com',
+])
+
+def site_domain(url):
+    """
+    Normalize a website URL to the host it is served from, without "www."
+    and keeping any explicit port, e.g. https://www.example.co.uk/locations
+    -> example.co.uk.
+    """
+    parsed = urlparse(url if '//' in url else '//' + url)
+    host = (parsed.hostname or '').rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    try:
+        port = parsed.port
+    except ValueError:
+        port = None
+    return f"{host}:{port}" if port else host
+
+def is_shared_hosting(host):
+    """True for a host on one of SHARED_HOSTING_DOMAINS or a subdomain of one"""
+    labels = host.split(':', 1)[0].split('.')
+    return any('.'.join(labels[start:]) in SHARED_HOSTING_DOMAINS for start in range(len(labels)))
+
+def shared_crawl_key(url):
+    """
+    Key under which the emails crawled from url can be shared with other
+    businesses, or None when they must not be: sites on shared hosting
+    platforms, and URLs with a path, where the path rather than the host
+    identifies the business.
+    """
+    domain = site_domain(url)
+    path = urlparse(url if '//' in url else '//' + url).path
+    if not domain or path.strip('/') or is_shared_hosting(domain):
+        return None
+    return domain
+
+class CrawlFrontier:
+    """
+    Priority queue of URLs still to visit on one site, deduplicated by
+    normalized URL. Adding a queued URL again with a better priority moves
+    it up; the old heap entry is skipped when it surfaces.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._seen = set()
+        self._queued = {}  # normalized URL -> priority, for URLs not yet popped
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._queued)
+
+    def mark_seen(self, url):
+        """Record a URL that was visited outside the frontier; False if it was already seen"""
+        key = normalize_url(url)
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        return True
+
+    def add(self, url, priority):
+        """Queue a URL unless it (or an equivalent URL) was seen before; a queued URL can move up"""
+        key = normalize_url(url)
+        if key in self._seen and not priority < self._queued.get(key, priority):
+            return False
+        self._seen.add(key)
+        self._queued[key] = priority
+        heapq.heappush(self._heap, (priority, next(self._counter), key, url))
+        return True
+
+    def _drop_stale(self):
+        # Entries left behind by a URL that was moved up or has been popped
+        while self._heap and self._queued.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def next_priority(self):
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_batch(self, size):
+        """Pop up to size URLs that share the best remaining priority"""
+        batch = []
+        priority = self.next_priority()
+        while self._heap and len(batch) < size and self._heap[0][0] == priority:
+            _, _, key, url = heapq.heappop(self._heap)
+            del self._queued[key]
+            batch.append(url)
+            self._drop_stale()
+        return batch
+
+class TokenBucket:
+    """Async token bucket used to pace requests to a single host"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        if self.rate <= 0:
+            return
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class DomainRegistry:
+    """
+    Emails found per website domain (see shared_crawl_key), shared by every
+    business that links to the domain. Branches of a chain often share one
+    website, so the first business to reach a domain crawls it and the rest
+    wait on that crawl instead of repeating it. Pass one registry to several
+    CrawlEngines (domains=...) to share crawls across searches in a run.
+    """
+
+    def __init__(self):
+        self.results = {}
+        self.counters = collections.Counter()
+        self._pending = {}  # domain -> future of the crawl in flight
+
+    async def emails_for(self, url, crawl):
+        """
+        Return (emails, crawled_at) for url's domain, awaiting crawl() (which
+        returns the same pair) only if no other business has crawled it. A
+        None emails result (site unreachable) is shared too. URLs without a
+        shared_crawl_key are always crawled on their own.
+        """
+        domain = shared_crawl_key(url)
+        if domain is None:
+            self.counters["unshared"] += 1
+            return await crawl()
+        while domain not in self.results:
+            pending = self._pending.get(domain)
+            if pending is None:
+                return await self._crawl(domain, crawl)
+            self.counters["waits"] += 1
+            # A crawl that was cancelled with its own search leaves the
+            # domain unclaimed, and the next waiter crawls it
+            await asyncio.wait([pending])
+        
+        self.counters["shared"] += 1
+        metrics.inc("domain_crawls_shared_total")
+        emails, crawled_at = self.results[domain]
+        return (list(emails) if emails is not None else None), crawled_at
+
+    async def _crawl(self, domain, crawl):
+        future = asyncio.get_running_loop().create_future()
+        self._pending[domain] = future
+        try:
+            emails, crawled_at = await crawl()
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            del self._pending[domain]
+        self.results[domain] = (list(emails) if emails is not None else None), crawled_at
+        self.counters["crawls"] += 1
+        future.set_result(None)
+        return emails, crawled_at
+
+    def stats(self):
+        return dict(self.counters, domains=len(self.results))
+
+class CrawlEngine:
+    """
+    Asynchronous crawl engine shared by all sites in a search batch.
+    Blocking fetches run on a thread pool sized to the global concurrency cap,
+    while a per-host semaphore and token bucket keep each site's load polite.
+    """
+
+    def __init__(self, global_concurrency=None, per_host_concurrency=None, host_rate=None, host_burst=None,
+                 http_client=None, email_budget=None, page_budget=None, domains=None, parse_pool=None,
+                 lead_store=None):
+        self.global_concurrency = global_concurrency or CRAWL_GLOBAL_CONCURRENCY
+        self.per_host_concurrency = per_host_concurrency or CRAWL_PER_HOST_CONCURRENCY
+        self.host_rate = CRAWL_HOST_RATE if host_rate is None else host_rate
+        self.host_burst = host_burst or CRAWL_HOST_BURST
+        self.http = http_client or get_http_client()
+        self.email_budget = email_budget or CRAWL_EMAIL_BUDGET
+        self.page_budget = page_budget or CRAWL_PAGE_BUDGET
+        self.domains = DomainRegistry() if domains is None else domains
+        self.lead_store = lead_store or get_lead_store()
+        parse_pool = parse_pool or get_parse_pool()
+        self.parser = PageParser(parse_pool) if parse_pool is not None else None
+        self.counters = collections.Counter()
+        self._global_slots = asyncio.Semaphore(self.global_concurrency)
+        self._hosts = {}
+        self._executor = ThreadPoolExecutor(max_workers=self.global_concurrency, thread_name_prefix="crawl")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def _host_limits(self, url):
+        host = urlparse(url).netloc.lower()
+        if host not in self._hosts:
+            self._hosts[host] = (
+                asyncio.Semaphore(self.per_host_concurrency),
+                TokenBucket(self.host_rate, self.host_burst),
+            )
+        return self._hosts[host]
+
+    async def run_blocking(self, func, *args):
+        """Run a blocking call on the engine's thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    async def fetch(self, url, sent=None):
+        """
+        Fetch a URL within the host and global limits, returning None on error.
+        A GET that goes to the network is counted in sent (a Counter), if given.
+        """
+        # Fresh cache hits cost the site nothing, so they skip the politeness limits
+        try:
+            cached = await self.run_blocking(self.http.lookup_page, url)
+        except Exception as e:
+            logger.error(f"Page cache error for {url}: {str(e)}")
+            cached = None
+        if cached is not None:
+            return cached
+        
+        if self.http.hosts.is_down(_url_host(url)):
+            return None
+        async with self._polite(url):
+            if sent is not None:
+                sent["GET"] += 1
+            try:
+                return await self.run_blocking(self.http.get_page, url)
+            except Exception as e:
+                logger.error(f"Error crawling {url}: {str(e)}")
+                return None
+
+    async def probe(self, url, sent=None):
+        """
+        Check a guessed URL with a HEAD request before fetching it. Returns
+        the URL to GET (where any redirect ended), or None if it is missing.
+        A HEAD that goes to the network is counted in sent, if given.
+        """
+        try:
+            cached = await self.run_blocking(self.http.lookup_page, url)
+        except Exception as e:
+            logger.error(f"Page cache error for {url}: {str(e)}")
+            cached = None
+        if cached is not None:
+            return url if cached.status_code == 200 else None
+        if self.http.hosts.is_down(_url_host(url)):
+            return None
+        
+        # HEADs are cheap for the site, so they take a request slot but no rate token
+        async with self._polite(url, paced=False):
+            if sent is not None and self.http.hosts.supports_head(_url_host(url)):
+                sent["HEAD"] += 1
+            try:
+                probed = await self.run_blocking(self.http.probe, url)
+            except Exception as e:
+                logger.error(f"Error probing {url}: {str(e)}")
+                return None
+        if probed is None:
+            return url
+        status_code, final_url = probed
+        return None if status_code in (404, 410) else final_url
+
+    @contextlib.asynccontextmanager
+    async def _polite(self, url, paced=True):
+        """Hold one request slot within the host and global limits; paced requests also take a rate token"""
+        host_slots, bucket = self._host_limits(url)
+        waiting_since = time.perf_counter()
+        async with host_slots:
+            if paced:
+                await bucket.acquire()
+            async with self._global_slots:
+                # Queueing, not work, so a counter rather than a stage
+                metrics.inc("politeness_wait_seconds_total", time.perf_counter() - waiting_since)
+                yield
+
+    async def fetch_page(self, url, base_url=None, sent=None):
+        """
+        Fetch and analyze one page; base_url enables contact link discovery.
+        Returns None when the page could not be fetched.
+        """
+        response = await self.fetch(url, sent)
+        if response is None or response.status_code != 200:
+            return None
+        
+        try:
+            if self.parser is not None:
+                return await self.parser.analyze(response.text, base_url)
+            return await self.run_blocking(analyze_page, response.text, base_url)
+        except Exception as e:
+            logger.error(f"Error processing {url}: {str(e)}")
+            return None
+
+    async def fetch_sitemap_urls(self, base_url, sent=None):
+        """Return same-site sitemap.xml entries whose path suggests a contact or team page"""
+        response = await self.fetch(base_url + 'sitemap.xml', sent)
+        if response is None or response.status_code != 200:
+            return []
+        
+        site_host = _site_host(base_url)
+        scored_urls = []
+        for loc in SITEMAP_LOC_PATTERN.findall(response.text):
+            loc = html.unescape(loc)
+            if _site_host(loc) != site_host:
+                continue
+            path = urlparse(loc).path.lower()
+            for rank, keyword in enumerate(SITEMAP_KEYWORDS):
+                if keyword in path:
+                    scored_urls.append((rank, loc))
+                    break
+        scored_urls.sort(key=lambda scored: scored[0])
+        return [loc for _, loc in scored_urls[:SITEMAP_MAX_URLS]]
+
+    async def crawl_site(self, base_url, homepage=None):
+        """
+        Crawl the homepage and potential contact pages of a website
+        to find email addresses. Pass the analysis of an already fetched
+        homepage (see site_base_url) to skip fetching it again.
+        
+        Pages are visited best-first from a CrawlFrontier: contact links found
+        on the homepage, then matching sitemap.xml entries, then the guessed
+        CONTACT_PATHS, which are checked with a HEAD request before any GET.
+        The crawl stops as soon as the email budget is met, when the HEADs
+        and GETs sent to the site reach the page budget, or when the host
+        keeps failing. Cache hits don't count towards the page budget.
+        """
+        if not base_url:
+            return []
+        base_url = site_base_url(base_url)
+        
+        frontier = CrawlFrontier()
+        frontier.mark_seen(base_url)
+        sent = collections.Counter()  # requests sent to the site, by method
+        if homepage is None:
+            logger.info(f"Checking homepage at {base_url}")
+            homepage = await self.fetch_page(base_url, base_url, sent) or analyze_page("")
+        else:
+            sent["GET"] += 1  # the caller's homepage fetch
+        
+        def budget_left():
+            return self.page_budget - sum(sent.values())
+        
+        # Every page's emails have already been validated
+        emails = dict.fromkeys(homepage["emails"])
+        for url in homepage["contact_links"]:
+            frontier.add(url, FRONTIER_DISCOVERED)
+        for path in CONTACT_PATHS:
+            frontier.add(base_url + path, FRONTIER_GUESSED)
+        
+        sitemap_checked = False
+        while frontier and len(emails) < self.email_budget and budget_left() > 0:
+            if self.http.hosts.is_down(_url_host(base_url)):
+                break
+            
+            # The sitemap is only worth a request once the homepage links are used up
+            if not sitemap_checked and frontier.next_priority() > FRONTIER_DISCOVERED:
+                sitemap_checked = True
+                for url in await self.fetch_sitemap_urls(base_url, sent):
+                    frontier.add(url, FRONTIER_SITEMAP)
+                continue
+            
+            # Likely contact pages are fetched one at a time so the crawl can stop
+            # early; guessed paths are swept in parallel
+            guessed = frontier.next_priority() == FRONTIER_GUESSED
+            width = self.per_host_concurrency if guessed else 1
+            # Each probe keeps a request in reserve for the GET of the page it may
+            # find; once the budget is too short for that, guessed paths are
+            # fetched directly, since a GET costs the budget no more than a HEAD
+            probes = min(width, budget_left() // 2) if guessed else 0
+            batch = frontier.pop_batch(probes or min(width, budget_left()))
+            if probes:
+                # Most guessed paths are missing, and some redirect to a page
+                # already seen; a HEAD finds out without downloading a body
+                targets = await asyncio.gather(*(self.probe(url, sent) for url in batch))
+                batch = [
+                    target for url, target in zip(batch, targets)
+                    if target is not None and (target == url or frontier.mark_seen(target))
+                ]
+            for page in await asyncio.gather(*(self.fetch_page(url, sent=sent) for url in batch)):
+                if page:
+                    emails.update(dict.fromkeys(page["emails"]))
+        
+        self.counters["sites"] += 1
+        self.counters["requests"] += sum(sent.values())
+        self.counters["probes"] += sent["HEAD"]
+        return list(emails)
+
+    async def domain_emails(self, url, crawl):
+        """
+        Return (emails, crawled_at) for url's domain: its emails and when
+        they were crawled. Each domain is crawled by crawl() at most once per
+        registry, and not at all if the lead store has a crawl younger than
+        LEAD_STALE_AFTER. crawl() returns None when the site couldn't be
+        reached; that is returned but not stored, so the next run tries
+        again. Sites without a shared_crawl_key (shared hosting platforms,
+        pages identified by their path) are never stored by domain.
+        """
+        domain = shared_crawl_key(url)
+        store = self.lead_store if domain is not None else None
+        
+        async def stored_or_crawl():
+            if store is not None:
+                stored = await self.run_blocking(store.domain_emails, domain, LEAD_STALE_AFTER)
+                if stored is not None:
+                    metrics.inc("stored_domains_reused_total")
+                    return stored
+            emails = await crawl()
+            crawled_at = time.time()
+            if emails is not None and store is not None:
+                await self.run_blocking(store.save_domain, domain, emails, crawled_at)
+            return emails, crawled_at
+        
+        return await self.domains.emails_for(url, stored_or_crawl)
+
+    async def crawl_sites(self, base_urls):
+        """Crawl several websites at once, returning email lists in input order"""
+        async def crawl(base_url):
+            if not base_url:
+                return []
+            emails, _ = await self.domain_emails(base_url, functools.partial(self.crawl_site, base_url))
+            return emails
+        
+        return await asyncio.gather(*(crawl(base_url) for base_url in base_urls))
+
+def crawl_many_contact_pages(base_urls, **engine_options):
+    """Crawl the contact pages of several websites concurrently"""
+    async def _crawl():
+        async with CrawlEngine(**engine_options) as engine:
+            return await engine.crawl_sites(base_urls)
+    
+    return asyncio.run(_crawl())
+
+def crawl_contact_pages(base_url):
+    """
+    Enhanced function to crawl potential contact pages of a given website
+    to find email addresses
+    """
+    if not base_url:
+        return []
+    return crawl_many_contact_pages([base_url])[0]
+
+# Enrichment Pipeline
+# Worker counts for the per-business enrichment stages
+GOOGLE_API_CONCURRENCY = int(os.environ.get("GOOGLE_API_CONCURRENCY", "4"))
+ENRICH_SITE_WORKERS = int(os.environ.get("ENRICH_SITE_WORKERS", "8"))
+
+# Places API endpoint (overridable for local stand-ins), paging and caching
+GOOGLE_PLACES_BASE_URL = os.environ.get("GOOGLE_PLACES_BASE_URL", "https://maps.googleapis.com/maps/api/place")
+PLACES_MAX_RESULTS = 60  # the text search returns at most three pages of 20
+PLACES_PAGE_TOKEN_DELAY = float(os.environ.get("PLACES_PAGE_TOKEN_DELAY", "2.0"))
+PLACES_SEARCH_TTL = float(os.environ.get("PLACES_SEARCH_TTL", str(24 * 3600)))
+PLACES_DETAILS_TTL = float(os.environ.get("PLACES_DETAILS_TTL", str(7 * 24 * 3600)))
+
+def fetch_places_text_search(query, google_places_key, page_token=None):
+    """Fetch one page of Places text search results"""
+    url = f"{GOOGLE_PLACES_BASE_URL}/textsearch/json?query={quote_plus(query)}&key={google_places_key}"
+    if page_token:
+        url += f"&pagetoken={page_token}"
+    with metrics.timer("places_search"):
+        response = get_http_client().get(url)
+        metrics.inc("places_requests_total", endpoint="textsearch")
+        return response.json()
+
+def cached_place_details(place_id):
+    """Return cached Place Details for place_id, or None"""
+    api_cache = get_api_cache()
+    if api_cache is None or not place_id:
+        return None
+    return api_cache.get(f"details:{place_id}")
+
+def fetch_place_details(place_id, google_places_key):
+    """Look up the website and phone number for a place"""
+    details_url = f"{GOOGLE_PLACES_BASE_URL}/details/json?place_id={place_id}&fields=website,formatted_phone_number&key={google_places_key}"
+    with metrics.timer("places_details"):
+        details_response = get_http_client().get(details_url)
+        metrics.inc("places_requests_total", endpoint="details")
+        details_data = details_response.json()
+    
+    api_cache = get_api_cache()
+    if api_cache is not None and details_data.get("status") == "OK":
+        api_cache.set(f"details:{place_id}", details_data, PLACES_DETAILS_TTL)
+    return details_data
+
+async def iter_places_results(engine, query, google_places_key, num_results, api_slots):
+    """
+    Yield Places text search results page by page, up to num_results.
+    Following pages are requested via next_page_token while the caller
+    enriches the page it was just given. Result lists are cached per query.
+    """
+    api_cache = get_api_cache()
+    cache_key = f"textsearch:{query.strip().lower()}"
+    cached = api_cache.get(cache_key) if api_cache is not None else None
+    if cached is not None and (len(cached["results"]) >= num_results or cached["complete"]):
+        yield cached["results"][:num_results]
+        return
+    
+    results = []
+    page_token = None
+    token_retries = 0
+    while True:
+        async with api_slots:
+            data = await engine.run_blocking(fetch_places_text_search, query, google_places_key, page_token)
+        
+        # A fresh next_page_token takes a moment to become valid
+        if page_token and data.get("status") == "INVALID_REQUEST" and token_retries < 3:
+            metrics.inc("places_token_retries_total")
+            token_retries += 1
+            await asyncio.sleep(PLACES_PAGE_TOKEN_DELAY)
+            continue
+        token_retries = 0
+        if data.get("status") != "OK":
+            if not results:
+                logger.error(f"Google Places API error: {data.get('status')}")
+            break
+        
+        page = data.get("results", [])
+        complete = len(page) <= num_results - len(results) and not data.get("next_page_token")
+        page = page[:num_results - len(results)]
+        results.extend(page)
+        yield page
+        
+        page_token = data.get("next_page_token")
+        if not page_token or len(results) >= num_results:
+            break
+        await asyncio.sleep(PLACES_PAGE_TOKEN_DELAY)
+    
+    # "complete" records that no further results exist beyond those cached
+    if api_cache is not None and results:
+        api_cache.set(cache_key, {"results": results, "complete": complete}, PLACES_SEARCH_TTL)
+
+def _count_business(business):
+    """Count an enriched business, whether it was crawled now or taken from the lead store"""
+    metrics.inc("businesses_total")
+    if business["email"]:
+        metrics.inc("businesses_with_email_total")
+
+async def enrich_business(engine, result, google_places_key, api_slots, site_slots):
+    """Run Place Details, the homepage fetch and the contact crawl for one result, unless the lead store has it"""
+    business = {
+        "name": result.get("name", ""),
+        "address": result.get("formatted_address", ""),
+        "place_id": result.get("place_id", ""),
+        "types": result.get("types", []),
+        "website": "",
+        "phone": "",
+        "email": []
+    }
+    
+    # Businesses enriched within LEAD_STALE_AFTER are taken from the lead store
+    if engine.lead_store is not None and business["place_id"]:
+        lead = await engine.run_blocking(engine.lead_store.get, business["place_id"], LEAD_STALE_AFTER)
+        if lead is not None:
+            business.update(website=lead["website"], phone=lead["phone"], email=lead["email"])
+            metrics.inc("stored_leads_reused_total")
+            _count_business(business)
+            return business
+    
+    # Get additional details for the business, bounded by the Google API cap
+    try:
+        details_data = await engine.run_blocking(cached_place_details, business["place_id"])
+        if details_data is None:
+            async with api_slots:
+                details_data = await engine.run_blocking(fetch_place_details, business["place_id"], google_places_key)
+    except Exception as e:
+        logger.error(f"Error fetching place details for {business['name']}: {str(e)}")
+        return business
+    
+    if details_data.get("status") == "OK" and "result" in details_data:
+        business["website"] = details_data["result"].get("website", "")
+        business["phone"] = details_data["result"].get("formatted_phone_number", "")
+        
+        # Extract emails from website if available; businesses sharing a
+        # domain share one crawl, and only the crawling one takes a site slot
+        if business["website"]:
+            async def find_emails():
+                async with site_slots:
+                    homepage = await engine.fetch_page(business["website"], site_base_url(business["website"]))
+                    if homepage is None:
+                        return None
+                    
+                    # If no emails found on the main page, try contact pages,
+                    # reusing the homepage we already have
+                    if homepage["emails"]:
+                        return homepage["emails"]
+                    return await engine.crawl_site(business["website"], homepage=homepage)
+            
+            emails, crawled_at = await engine.domain_emails(business["website"], find_emails)
+            business["email"] = emails or []
+        else:
+            emails, crawled_at = [], None
+        
+        # Unreachable websites aren't stored, so the next search tries them
+        # again. A lead is as old as its emails, which may come from an
+        # earlier stored crawl of its domain.
+        if engine.lead_store is not None and emails is not None:
+            await engine.run_blocking(engine.lead_store.save, business, crawled_at)
+    
+    _count_business(business)
+    return business
+
+EnrichmentEvent = collections.namedtuple("EnrichmentEvent", ["index", "business", "completed", "discovered"])
+
+async def stream_search_and_enrich(query, google_places_key, num_results=5, api_workers=None, site_workers=None,
+                                   skip_place_ids=(), engine=None, api_slots=None, **engine_options):
+    """
+    Search Places and enrich every result concurrently, yielding an
+    EnrichmentEvent as soon as each business is ready. Events arrive in
+    completion order; event.index is the business's Places ranking.
+    Results whose place_id is in skip_place_ids (already enriched by an
+    earlier, interrupted run) count towards progress but are not re-enriched.
+    Concurrent searches can share one engine and api_slots semaphore so the
+    crawl and API limits hold across all of them; a shared engine is left open.
+    """
+    owns_engine = engine is None
+    api_slots = api_slots or asyncio.Semaphore(api_workers or GOOGLE_API_CONCURRENCY)
+    site_slots = asyncio.Semaphore(site_workers or ENRICH_SITE_WORKERS)
+    skip_place_ids = set(skip_place_ids)
+    finished = asyncio.Queue()
+    tasks = []
+    discovered = 0
+    completed = 0
+    
+    async with CrawlEngine(**engine_options) if owns_engine else contextlib.nullcontext(engine) as engine:
+        async def enrich(index, result):
+            business = await enrich_business(engine, result, google_places_key, api_slots, site_slots)
+            finished.put_nowait((index, business))
+        
+        async def discover():
+            # The next results page is fetched while the current one is enriched
+            nonlocal discovered, completed
+            try:
+                async for page in iter_places_results(engine, query, google_places_key, num_results, api_slots):
+                    for result in page:
+                        if result.get("place_id") in skip_place_ids:
+                            completed += 1
+                        else:
+                            tasks.append(asyncio.ensure_future(enrich(discovered, result)))
+                        discovered += 1
+                await asyncio.gather(*tasks)
+            finally:
+                finished.put_nowait(None)
+        
+        discovery = asyncio.ensure_future(discover())
+        try:
+            while True:
+                item = await finished.get()
+                if item is None:
+                    break
+                completed += 1
+                yield EnrichmentEvent(item[0], item[1], completed, discovered)
+            await discovery
+        finally:
+            # Cancel outstanding work if the consumer stops early
+            for task in [discovery, *tasks]:
+                task.cancel()
+            await asyncio.gather(discovery, *tasks, return_exceptions=True)
+    
+    if owns_engine:
+        log_crawl_stats(engine)
+
+def log_crawl_stats(engine):
+    """Log how many requests an engine's contact crawls took and how its domain registry did"""
+    if engine.counters["sites"]:
+        logger.info(
+            f"Contact crawl: {engine.counters['sites']} sites, {engine.counters['requests']} requests "
+            f"({engine.counters['probes']} HEAD; {engine.counters['requests'] / engine.counters['sites']:.1f} per site)"
+        )
+    logger.info(f"Domain registry: {engine.domains.stats()}")
+
+async def search_and_enrich(query, google_places_key, num_results=5, api_workers=None, site_workers=None,
+                            **engine_options):
+    """
+    Search Places and enrich every result concurrently. Details lookups,
+    website fetches and contact crawls for different businesses overlap,
+    the next results page is fetched while the current one is enriched,
+    and businesses are returned in the original Places ranking order.
+    """
+    businesses = {}
+    async for event in stream_search_and_enrich(query, google_places_key, num_results, api_workers, site_workers,
+                                                **engine_options):
+        businesses[event.index] = event.business
+    return [businesses[index] for index in sorted(businesses)]
+
+def log_fetch_stats():
+    """Log HTTP and cache stats after a search and write the metrics text file if METRICS_DIR is set"""
+    logger.info(f"HTTP body stats: {get_http_client().stats()}")
+    page_cache = get_page_cache()
+    if page_cache is not None:
+        logger.info(f"Page cache stats: {page_cache.stats()}")
+    api_cache = get_api_cache()
+    if api_cache is not None:
+        logger.info(f"API cache stats: {api_cache.stats()}")
+    lead_store = get_lead_store()
+    if lead_store is not None:
+        logger.info(f"Lead store stats: {lead_store.stats()}")
+    metrics.write_textfile()
+
+def iter_businesses_from_query(query, google_places_key, num_results=5, api_workers=None, site_workers=None,
+                               skip_place_ids=()):
+    """
+    Synchronous view of stream_search_and_enrich for callers without an
+    event loop, such as the Streamlit script. The pipeline only advances
+    while the caller iterates; closing the generator cancels pending work.
+    """
+    if not query or not google_places_key:
+        return
+    
+    num_results = min(num_results, PLACES_MAX_RESULTS)
+    loop = asyncio.new_event_loop()
+    events = stream_search_and_enrich(query, google_places_key, num_results, api_workers, site_workers,
+                                      skip_place_ids)
+    try:
+        while True:
+            try:
+                event = loop.run_until_complete(events.__anext__())
+            except StopAsyncIteration:
+                break
+            yield event
+    finally:
+        loop.run_until_complete(events.aclose())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+        log_fetch_stats()
+
+def extract_businesses_from_query(query, google_places_key, num_results=5, api_workers=None, site_workers=None):
+    if not query or not google_places_key:
+        return []
+    
+    num_results = min(num_results, PLACES_MAX_RESULTS)
+    businesses = asyncio.run(search_and_enrich(query, google_places_key, num_results, api_workers, site_workers))
+    log_fetch_stats()
+    return businesses
+
+# LLM Functions for Email Extraction
+OPENAI_MODEL = os.environ.get("OPENAI_MODEL", "gpt-4.1")
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL", "")  # any OpenAI-compatible server
+LLM_CONCURRENCY = int(os.environ.get("LLM_CONCURRENCY", "4"))
+LLM_REQUESTS_PER_SECOND = float(os.environ.get("LLM_REQUESTS_PER_SECOND", "2.0"))
+LLM_BATCH_SIZE = int(os.environ.get("LLM_BATCH_SIZE", "5"))  # businesses packed into one request
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", str(30 * 24 * 3600)))
+
+LLM_SYSTEM_PROMPT = "You are a helpful assistant that deduces business email addresses based on patterns."
+LLM_JSON_PATTERN = re.compile(r'\{.*\}', re.DOTALL)
+
+class LLMResponseError(ValueError):
+    """Raised when a batched LLM answer can't be parsed"""
+
+def create_openai_client(openai_api_key):
+    """Create the OpenAI client, pointed at OPENAI_BASE_URL when one is configured"""
+    from openai import OpenAI
+    return OpenAI(api_key=openai_api_key, base_url=OPENAI_BASE_URL or None)
+
+def format_business_data_for_llm(business):
+    """Format business data as context for the LLM"""
+    context = f"""
+Name: {business.get('name', 'Unknown')}
+Address: {business.get('address', 'Unknown')}
+Website: {business.get('website', 'Unknown')}
+Phone: {business.get('phone', 'Unknown')}
+Business Types: {', '.join(business.get('types', ['Unknown']))}
+Emails Found: {', '.join(business.get('email', []))}
+    """
+    return context
+
+def llm_fingerprint(business):
+    """Cache key for a business's LLM suggestions: a hash of the model and its LLM context"""
+    context = format_business_data_for_llm(business)
+    return hashlib.sha256(f"{OPENAI_MODEL}\n{context}".encode("utf-8")).hexdigest()
+
+def _complete(openai_client, prompt, max_tokens):
+    with metrics.timer("llm"):
+        response = openai_client.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=[
+                {"role": "system", "content": LLM_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.3,
+            max_tokens=max_tokens
+        )
+    metrics.inc("llm_requests_total")
+    if response.usage is not None:
+        metrics.inc("llm_tokens_total", response.usage.prompt_tokens, kind="prompt")
+        metrics.inc("llm_tokens_total", response.usage.completion_tokens, kind="completion")
+    return response.choices[0].message.content.strip()
+
+def _suggest_emails_single(business, openai_client):
+    """Ask the LLM about one business; returns validated emails, or None on error"""
+    context = format_business_data_for_llm(business)
+    
+    prompt = f"""You are an expert at deducing business email addresses. Based on the following business information, 
+    suggest the most likely email address formats for contacting this business. 
+    
+    {context}
+    
+    Based on common patterns for businesses of this type, suggest the 2 most likely email addresses. 
+    If you can't make a good suggestion, reply with "No email suggestion available."
+    Only provide email addresses that follow standard conventions and avoid any that might be incorrect.
+    If you previously found emails, prioritize those found emails. Do not make up emails that couldn't be correct.
+    
+    Most likely email addresses:
+    """
+    
+    try:
+        suggestions_text = _complete(openai_client, prompt, max_tokens=150)
+        
+        # Extract valid email patterns from the response
+        return unique_valid_emails(EMAIL_PATTERN.findall(suggestions_text))
+    except Exception as e:
+        logger.error(f"Error using LLM for email suggestion: {str(e)}")
+        return None
+
+def _suggest_emails_batch(businesses, openai_client):
+    """
+    Ask the LLM about several businesses in one structured request.
+    Returns one list of validated emails per business (None where it failed
+    or the answer left the business out). Raises LLMResponseError when the
+    answer isn't the JSON asked for.
+    """
+    if len(businesses) == 1:
+        return [_suggest_emails_single(businesses[0], openai_client)]
+    
+    contexts = "\n".join(
+        f"Business {number}:{format_business_data_for_llm(business)}"
+        for number, business in enumerate(businesses, 1)
+    )
+    prompt = f"""You are an expert at deducing business email addresses. For each business below,
+    suggest the 2 most likely email addresses based on common patterns for businesses of its type.
+    Only provide email addresses that follow standard conventions and avoid any that might be incorrect.
+    Do not make up emails that couldn't be correct; use an empty list if you can't make a good suggestion.
+    
+    {contexts}
+    
+    Reply with JSON only, in this form:
+    {{"businesses": [{{"id": 1, "emails": ["..."]}}, {{"id": 2, "emails": []}}]}}
+    """
+    
+    try:
+        response_text = _complete(openai_client, prompt, max_tokens=80 * len(businesses) + 50)
+    except Exception as e:
+        # API errors (rate limits, timeouts) aren't retried here; the
+        # businesses stay uncached and are asked about again next time
+        logger.error(f"Error using LLM for email suggestion: {str(e)}")
+        return [None] * len(businesses)
+    
+    try:
+        json_match = LLM_JSON_PATTERN.search(response_text)
+        if not json_match:
+            raise ValueError("no JSON object in response")
+        entries = json.loads(json_match.group(0))["businesses"]
+        suggestions = {}
+        for entry in entries:
+            emails = EMAIL_PATTERN.findall(" ".join(str(email) for email in entry.get("emails", [])))
+            suggestions[int(entry["id"])] = unique_valid_emails(emails)
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise LLMResponseError(str(e)) from e
+    return [suggestions.get(number) for number in range(1, len(businesses) + 1)]
+
+async def suggest_emails_with_llm_async(businesses, openai_client, batch_size=None, concurrency=None,
+                                        requests_per_second=None):
+    """
+    LLM email inference stage. Businesses that already have emails keep them,
+    cached suggestions are reused by llm_fingerprint, and the rest are packed
+    into batches that run concurrently under a rate limit. Returns one email
+    list per business, in order.
+    """
+    results = [list(business.get("email", [])) for business in businesses]
+    if not openai_client:
+        return results
+    
+    api_cache = get_api_cache()
+    pending = []
+    for index, business in enumerate(businesses):
+        # If we already have emails, keep them
+        if business.get("email"):
+            continue
+        fingerprint = llm_fingerprint(business)
+        cached = api_cache.get(f"llm:{fingerprint}") if api_cache is not None else None
+        if cached is not None:
+            results[index] = cached
+        else:
+            pending.append((index, fingerprint))
+    if not pending:
+        return results
+    
+    batch_size = batch_size or LLM_BATCH_SIZE
+    concurrency = concurrency or LLM_CONCURRENCY
+    slots = asyncio.Semaphore(concurrency)
+    rate_limiter = TokenBucket(LLM_REQUESTS_PER_SECOND if requests_per_second is None else requests_per_second, concurrency)
+    loop = asyncio.get_running_loop()
+    
+    async def run_batch(batch):
+        async with slots:
+            await rate_limiter.acquire()
+            try:
+                return await loop.run_in_executor(
+                    None, _suggest_emails_batch, [businesses[index] for index, _ in batch], openai_client
+                )
+            except LLMResponseError as e:
+                logger.warning(f"LLM batch response unusable, retrying individually: {str(e)}")
+        # Retried outside the slot, so each request takes a slot and a rate token of its own
+        retried = await asyncio.gather(*(run_batch([item]) for item in batch))
+        return [suggestions[0] for suggestions in retried]
+    
+    batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+    for batch, suggestions in zip(batches, await asyncio.gather(*(run_batch(batch) for batch in batches))):
+        for (index, fingerprint), emails in zip(batch, suggestions):
+            if emails is None:
+                continue
+            results[index] = emails
+            if api_cache is not None:
+                api_cache.set(f"llm:{fingerprint}", emails, LLM_CACHE_TTL)
+    return results
+
+def suggest_emails_with_llm(businesses, openai_client, **options):
+    """Run the LLM email inference stage over a list of businesses"""
+    return asyncio.run(suggest_emails_with_llm_async(businesses, openai_client, **options))
+
+def extract_potential_emails_with_llm(business, openai_client):
+    """Use LLM to deduce or extract possible email addresses based on business context"""
+    return suggest_emails_with_llm([business], openai_client)[0]
+
+# Export Functions
+# Every format goes through the same row projection and is written in
+# chunks to a binary stream, so exporting a large bulk run uses constant
+# memory. Parquet needs pyarrow, which is optional. The writers import
+# their libraries when they are first used.
+
+EXPORT_CHUNK_ROWS = int(os.environ.get("EXPORT_CHUNK_ROWS", "5000"))
+EXPORT_COLUMNS = ["Name", "Address", "Website", "Phone", "Types", "Emails"]
+
+ExportFormat = collections.namedtuple("ExportFormat", ["label", "writer", "mime"])
+
+def business_to_row(business):
+    """Project a business onto EXPORT_COLUMNS"""
+    return (
+        business.get('name', ''),
+        business.get('address', ''),
+        business.get('website', ''),
+        business.get('phone', ''),
+        ', '.join(business.get('types', [])),
+        ', '.join(business.get('email', []))
+    )
+
+def iter_export_chunks(businesses, chunk_rows=None):
+    """Yield lists of projected rows, at most chunk_rows at a time"""
+    rows = map(business_to_row, businesses)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_rows or EXPORT_CHUNK_ROWS))
+        if not chunk:
+            return
+        yield chunk
+
+def write_businesses_csv(businesses, out):
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    writer = csv.writer(text, lineterminator="\n")
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in iter_export_chunks(businesses):
+        writer.writerows(chunk)
+    text.flush()
+    text.detach()
+
+def write_businesses_jsonl(businesses, out):
+    for chunk in iter_export_chunks(businesses):
+        lines = (json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) for row in chunk)
+        out.write(("\n".join(lines) + "\n").encode("utf-8"))
+
+def write_businesses_excel(businesses, out):
+    import openpyxl
+
+    # Write-only mode streams rows to the sheet instead of keeping cell objects
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append(EXPORT_COLUMNS)
+    for chunk in iter_export_chunks(businesses):
+        for row in chunk:
+            sheet.append(row)
+    workbook.save(out)
+
+def write_businesses_parquet(businesses, out):
+    import pyarrow
+    import pyarrow.parquet
+
+    schema = pyarrow.schema([(column, pyarrow.string()) for column in EXPORT_COLUMNS])
+    with pyarrow.parquet.ParquetWriter(out, schema) as writer:
+        # One row group per chunk
+        for chunk in iter_export_chunks(businesses):
+            writer.write_batch(pyarrow.RecordBatch.from_arrays(
+                [pyarrow.array(column, pyarrow.string()) for column in zip(*chunk)], schema=schema
+            ))
+
+EXPORT_FORMATS = {
+    "csv": ExportFormat("CSV", write_businesses_csv, "text/csv"),
+    "xlsx": ExportFormat("Excel", write_businesses_excel,
+                         "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "jsonl": ExportFormat("JSONL", write_businesses_jsonl, "application/jsonl"),
+}
+if importlib.util.find_spec("pyarrow"):
+    EXPORT_FORMATS["parquet"] = ExportFormat("Parquet", write_businesses_parquet, "application/vnd.apache.parquet")
+
+def export_businesses(businesses, file_format, path=None):
+    """
+    Export businesses (any iterable, consumed once) in one of EXPORT_FORMATS.
+    Writes to path when given, otherwise returns the exported bytes.
+    """
+    writer = EXPORT_FORMATS[file_format].writer
+    if path is not None:
+        with open(path, "wb") as out:
+            writer(businesses, out)
+        return None
+    
+    buffer = io.BytesIO()
+    writer(businesses, buffer)
+    return buffer.getvalue()
+
+def export_businesses_to_csv(businesses, filename="business_data.csv"):
+    """Export business data to CSV file"""
+    if not businesses:
+        return None
+    return export_businesses(businesses, "csv").decode("utf-8")
+
+def export_businesses_to_excel(businesses, filename="business_data.xlsx"):
+    """Export business data to Excel file"""
+    if not businesses:
+        return None
+    return export_businesses(businesses, "xlsx")
+